@@ -42,8 +42,11 @@ class ConnectionManager:
             if robot_client.is_connected():
                 state = await robot_client.read_state()
                 if state:
-                    # Convert radians to degrees for frontend convenience
+                    # Convert radians to degrees for frontend convenience; JSON needs plain lists.
+                    # The client only stamps packets with an integer clock; format it once per broadcast here.
                     state["joints"] = [math.degrees(q) for q in state["joints"]]
+                    state["tcp_pose"] = state["tcp_pose"].tolist()
+                    state["timestamp"] = datetime.fromtimestamp(state["timestamp_ns"] / 1e9).isoformat()
                     await self.broadcast(json.dumps(state))
             await asyncio.sleep(0.1) # 10Hz update rate
         print("[RobotWS] Stopping state broadcast task")
@@ -343,12 +346,14 @@ async def set_speed(
     # s must be between 0 and 1
     s = max(0.0, min(1.0, request.speed))
     
-    # Use the smart setter that tries RTDE then Dashboard
+    # Queued for the client's speed flusher (RTDE, falling back to URScript). False means the
+    # flusher's last send was not delivered, so this value cannot be expected to arrive either
     success = await robot_client.set_robot_speed(s)
-    method = "Interface (RTDE/Dashboard)" if success else "Script Fallback"
+    method = "Queued (RTDE/URScript)"
     
     if not success:
-        # Final fallback to script if both industrial interfaces failed
+        # Final fallback: send the script directly on the primary connection
+        method = "Script Fallback"
         script = f"set_speed_slider_fraction({s})"
         success = await robot_client.send_command(script)
     
@@ -1,13 +1,17 @@
+import array
 import asyncio
 import socket
 import struct
 import ftplib
+import operator
 import os
+import re
+import select
 import threading
 import paramiko
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
-from datetime import datetime
 
 try:
     import rtde.rtde as rtde
@@ -17,6 +21,198 @@ except ImportError:
     RTDE_LIB_AVAILABLE = False
     print("[RobotClient] Warning: RTDE library not found. Manual RTDE will be used (if implemented correctly) or fail.")
 
+RTDE_CONFIG_FILE = "record_config.xml"
+
+# Potential directories where programs might be stored on the controller
+PROGRAM_SEARCH_DIRS = ["/programs", "/root/programs", "/home/root", "/"]
+
+# Seconds between SSH keepalive packets on the cached SFTP session
+SFTP_KEEPALIVE_INTERVAL = 30
+# Bound every phase of the SSH handshake; paramiko otherwise waits up to 15 s for the banner and 30 s for auth
+SFTP_CONNECT_TIMEOUTS = {"timeout": 5.0, "banner_timeout": 5.0, "auth_timeout": 5.0}
+
+# Re-query the loaded program at least this often (seconds) to pick up loads made on the pendant
+LOADED_PROGRAM_REFRESH_INTERVAL = 30.0
+
+# Dashboard status poll period (seconds); RTDE already streams modes, so poll less often when it is live
+STATUS_POLL_INTERVAL = 2.0
+STATUS_POLL_INTERVAL_RTDE = 5.0
+
+# Dashboard status replies -> internal mode codes; each reply is scanned once by a compiled alternation.
+# The poller works on the raw reply bytes, so these are byte patterns.
+_ROBOT_MODE_MAP = {
+    b"running": 7, b"idle": 5, b"power_on": 4, b"power_off": 3,
+    b"booting": 2, b"confirm_safety": 1, b"disconnected": 0
+}
+_ROBOT_MODE_RE = re.compile(b"|".join(_ROBOT_MODE_MAP))
+_PROGRAM_STATE_MAP = {b"playing": 1, b"paused": 2, b"stopped": 0}
+_PROGRAM_STATE_RE = re.compile(b"|".join(_PROGRAM_STATE_MAP))
+_SAFETY_MODE_MAP = {b"PROTECTIVE_STOP": 3, b"EMERGENCY_STOP": 4, b"NORMAL": 1}
+_SAFETY_MODE_RE = re.compile(b"|".join(_SAFETY_MODE_MAP))
+
+# Every Dashboard reply to load/play/pause/stop/unlock is classified with this one case-insensitive
+# scan; the matched group name says what the reply is (see _classify_reply)
+_REPLY_RE = re.compile(
+    r"(?P<denied>remote control mode is disabled)|(?P<failexec>failed to execute(?P<failcmd>.*))"
+    r"|(?P<notfound>file not found)|(?P<error>error|failed)|(?P<banner>connected:|dashboard server)"
+    r"|(?P<load>loading|loaded)|(?P<play>starting|playing|started)|(?P<pause>pausing|paused)"
+    r"|(?P<stop>stopped|stopping)|(?P<unlock>protective stop releasing|unlocking)",
+    re.I
+)
+_REPLY_FAILURES = frozenset(("denied", "failself", "error", "notfound"))
+
+
+def _classify_reply(result: str, command: str) -> Optional[str]:
+    """Classify a Dashboard reply to `command` (one of the _REPLY_RE state group names).
+
+    Returns "ok" if the reply confirms the command, "failself" if it reports this command failing,
+    otherwise the matched group (a banner, an error, another command's state) or None.
+    """
+    m = _REPLY_RE.search(result)
+    if not m:
+        return None
+    kind = m.lastgroup
+    if kind == command:
+        return "ok"
+    if kind == "failexec" and command in m.group("failcmd").lower():
+        return "failself"
+    return kind
+
+
+# Program transitions: command -> (target program_state, programState word that confirms it,
+# whether RTDE confirmation alone is enough so the reply needn't be awaited)
+_TRANSITIONS = {
+    "play": (1, "playing", False),
+    "pause": (2, "paused", True),
+    "stop": (0, "stopped", True),
+}
+
+# RTDE output fields read by _apply_rtde_state, in unpacking order
+_RTDE_STATE_FIELDS = (
+    'robot_mode', 'safety_mode', 'output_runtime_state', 'actual_TCP_pose',
+    'actual_q', 'speed_scaling', 'target_speed_fraction'
+)
+
+# RTDE package header: big-endian uint16 size (header included) and a uint8 command; data packages are 'U'
+_RTDE_HEADER_STRUCT = struct.Struct('>HB')
+_RTDE_DATA_PACKAGE = ord('U')
+# While only part of an RTDE package has arrived, re-check the socket after this delay (seconds)
+# instead of spinning on its readable event
+RTDE_PARTIAL_RETRY_DELAY = 0.001
+
+# Speed slider updates are coalesced and only the latest is sent, at most once per interval (seconds).
+# URScript speed commands are parsed as a program on the robot, so they are debounced longer.
+RTDE_SPEED_FLUSH_INTERVAL = 0.025
+SCRIPT_SPEED_FLUSH_INTERVAL = 0.05
+
+# Port 30003 frame layout: big-endian int32 length header; q_actual at byte 252 and the actual TCP
+# pose at byte 444 (6 doubles each). Both are unpacked in one call, with the 144 bytes between them
+# skipped as padding; nothing else in the frame is read.
+_LEN_STRUCT = struct.Struct('!i')
+_FEEDBACK_Q_OFFSET = 252
+_FEEDBACK_FIELDS_STRUCT = struct.Struct('!6d144x6d')
+_FEEDBACK_MIN_LENGTH = _FEEDBACK_Q_OFFSET + _FEEDBACK_FIELDS_STRUCT.size
+
+# The 30003 stream is ~125 Hz; reading pauses for this long (seconds) after each sample, so the
+# kernel buffers the frames in between and only the newest of each burst is parsed
+FEEDBACK_SAMPLE_INTERVAL = 0.04
+
+# Parsed RTDE recipes ({recipe_name: (names, types)}), loaded once per process
+_rtde_recipes: Optional[dict] = None
+
+
+# RTDE fields each robot accepted per recipe ({(host, recipe_name): names}), so reconnects skip discovery
+_negotiated_rtde_fields: dict[tuple[str, str], list[str]] = {}
+
+
+def load_rtde_recipes() -> dict:
+    """Locate and parse the RTDE recipe config once; the XML has no runtime dependence."""
+    global _rtde_recipes
+    if _rtde_recipes is None:
+        candidates = [
+            os.path.join(os.getcwd(), RTDE_CONFIG_FILE),
+            os.path.join(os.path.dirname(os.path.dirname(__file__)), RTDE_CONFIG_FILE),
+        ]
+        config_path = next((path for path in candidates if os.path.exists(path)), None)
+        if config_path is None:
+            raise FileNotFoundError(f"{RTDE_CONFIG_FILE} not found in {candidates}")
+
+        print(f"[RobotClient] RTDE: Using config at {config_path}")
+        config = rtde_config.ConfigFile(config_path)
+        _rtde_recipes = {name: config.get_recipe(name) for name in ("state", "set_speed")}
+    return _rtde_recipes
+
+
+class FeedbackProtocol(asyncio.BufferedProtocol):
+    """Reads the port 30003 real-time feedback stream into a preallocated buffer.
+
+    Frames are parsed in place, so no per-packet bytes objects are allocated. After each
+    sample, reading is paused for FEEDBACK_SAMPLE_INTERVAL and only the newest complete
+    frame of the next burst is handed to the client.
+    """
+
+    def __init__(self, client: "RobotTCPClient"):
+        self.client = client
+        self.transport: Optional[asyncio.Transport] = None
+        # Room for a whole sampling interval of frames (CB3/e-Series frames are ~1.1 KB)
+        self._buf = bytearray(16384)
+        self._view = memoryview(self._buf)
+        self._filled = 0
+        self._offered = 0
+        self._resume_handle: Optional[asyncio.TimerHandle] = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint):
+        self._offered = len(self._buf) - self._filled
+        return self._view[self._filled:]
+
+    def buffer_updated(self, nbytes):
+        self._filled += nbytes
+
+        # Find the newest complete frame, then compact the leftover once
+        start = 0
+        latest = None
+        while self._filled - start >= 4:
+            length = _LEN_STRUCT.unpack_from(self._buf, start)[0]
+            if length <= 4 or length > len(self._buf):
+                print(f"[RobotClient] Feedback stream out of sync (length={length}), closing")
+                self.transport.close()
+                return
+            if self._filled - start < length:
+                break
+            latest = (start, length)
+            start += length
+
+        if latest:
+            self.client._on_feedback_packet(self._buf, *latest)
+
+        # Shift the partial next frame (if any) to the head of the buffer
+        remaining = self._filled - start
+        if start and remaining:
+            self._view[:remaining] = self._view[start:self._filled]
+        self._filled = remaining
+
+        # A short read means the socket is drained; let the kernel collect the next interval's frames.
+        # A full read means more is already queued, so keep reading to avoid falling behind.
+        if latest and nbytes < self._offered and not self.transport.is_closing():
+            self.transport.pause_reading()
+            self._resume_handle = asyncio.get_running_loop().call_later(FEEDBACK_SAMPLE_INTERVAL, self._resume)
+
+    def _resume(self):
+        self._resume_handle = None
+        if self.transport and not self.transport.is_closing():
+            self.transport.resume_reading()
+
+    def connection_lost(self, exc):
+        if self._resume_handle:
+            self._resume_handle.cancel()
+            self._resume_handle = None
+        if exc:
+            print(f"[RobotClient] Feedback connection lost: {exc}")
+        self.client.feedback_connected = False
+
 
 class RobotTCPClient:
     def __init__(self):
@@ -26,155 +222,278 @@ class RobotTCPClient:
         self.host: Optional[str] = None
         self.port: Optional[int] = None
         
-        self.feedback_reader: Optional[asyncio.StreamReader] = None
-        self.feedback_writer: Optional[asyncio.StreamWriter] = None
+        self.feedback_transport: Optional[asyncio.Transport] = None
         self.feedback_connected = False
+        self._feedback_logged_info = False
         
         self.dashboard_reader: Optional[asyncio.StreamReader] = None
         self.dashboard_writer: Optional[asyncio.StreamWriter] = None
         self.dashboard_connected = False
         self.dashboard_lock = asyncio.Lock()
+        self._dashboard_unread = 0  # Replies to write-only commands not consumed yet
+        self._inflight: dict[str, asyncio.Future] = {}  # Running play/pause/stop, shared by concurrent callers
 
         self.rtde_con: Optional[rtde.RTDE] = None
-        self.rtde_config: Optional[rtde_config.ConfigFile] = None
+        # The RTDE library is not thread-safe; the handshake and disconnect are serialized on this one thread
+        # (data packages are read by the loop reader or _rtde_worker, and speed packages sent inline)
+        self._rtde_exec = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rtde")
         self.rtde_connected = False
         self.rtde_watch_input = None
+        # Single C-level fetch of every consumed output field; only set when the robot negotiated all of them
+        self._rtde_getter: Optional[operator.attrgetter] = None
         self.rtde_speed_slider = 1.0
+        self._pending_speed: Optional[float] = None
+        self._speed_dirty = asyncio.Event()
+        self._speed_flush_task: Optional[asyncio.Task] = None
+        self._last_speed_send_ok = True  # Result of the flusher's most recent send
+        self._feedback_reopen_task: Optional[asyncio.Task] = None  # Replaces RTDE if it drops mid-session
 
         
         self.latest_state: Optional[dict] = None
-        self.feedback_task: Optional[asyncio.Task] = None
+        # Published state lives in one dict whose float buffers are overwritten in place on every packet;
+        # read_state hands out copies, so nothing outside the client ever holds a reference to it
+        self._joints_buf = array.array('d', [0.0] * 6)
+        self._tcp_buf = array.array('d', [0.0] * 6)
+        self._state_buf = {
+            "joints": self._joints_buf,
+            "tcp_pose": self._tcp_buf,
+            "tcp_offset": [0.0] * 6,
+            "speed_slider": 1.0,
+            "robot_mode": -1,
+            "safety_mode": -1,
+            "program_state": 0,
+            "loaded_program": None,
+            "timestamp_ns": 0
+        }
+        # Last published joints/TCP pose sequences, compared as-is to detect unchanged updates
+        self._last_joints = None
+        self._last_tcp_pose = None
         self.rtde_thread: Optional[threading.Thread] = None
+        self._rtde_reader_fd: Optional[int] = None
         self.rtde_stop_event = threading.Event()
         self.status_poller_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # Loop that owns the client state; set in connect()
 
         self.robot_mode: int = -1
         self.safety_mode: int = -1
+        self._program_state_changed = asyncio.Event()  # Set on every program_state change
         self.program_state: int = 0  # 0: STOPPED, 1: PLAYING, 2: PAUSED
         self.program_state_lock_until: float = 0.0
         self.loaded_program: Optional[str] = None
+        self._loaded_program_dirty = True  # Set after load/play/stop so get_loaded_program re-queries the Dashboard
+        self._loaded_program_checked_at = 0.0
 
         self.ftp_user = os.getenv("ROBOT_SFTP_USER", "root")
         self.ftp_password = os.getenv("ROBOT_SFTP_PASSWORD", "easybot")
 
+        # Long-lived SSH/SFTP session, warmed up after connect (or opened lazily by list_programs) and closed on disconnect
+        self._ssh: Optional[paramiko.SSHClient] = None
+        self._sftp_channels: list[paramiko.SFTPClient] = []
+        self._sftp_host: Optional[str] = None  # Host the cached session is connected to
+        # Bumped by disconnect(); a worker thread that finishes connecting for an older generation
+        # discards its session instead of storing it. The lock orders that check against the bump.
+        self._sftp_generation = 0
+        self._sftp_state_lock = threading.Lock()
+        self._sftp_lock = asyncio.Lock()
+        self._sftp_warmup_task: Optional[asyncio.Task] = None
+        # Dedicated workers (one per search directory) so slow SFTP listings don't tie up the default executor
+        self._sftp_pool = ThreadPoolExecutor(max_workers=len(PROGRAM_SEARCH_DIRS), thread_name_prefix="sftp")
+
+
+    @property
+    def program_state(self) -> int:
+        return self._program_state
+
+    @program_state.setter
+    def program_state(self, value: int):
+        # Only ever written on the event loop thread, so waiters can be woken directly
+        if getattr(self, "_program_state", None) != value:
+            self._program_state = value
+            self._program_state_changed.set()
 
     async def connect(self, host: str, port: int) -> bool:
-        """Connect to the UR5 robot controller with timeouts."""
+        """Connect to the UR5 robot controller with timeouts.
+
+        The primary, feedback, Dashboard and RTDE connections are independent, so they are opened
+        concurrently; only a failure of the primary connection aborts the whole call.
+        """
+        print(f"[RobotClient] Connecting to {host}:{port}...")
+        self._loop = asyncio.get_running_loop()
+        primary, _, _, _ = await asyncio.gather(
+            self._open_primary(host, port),
+            self._open_feedback(host),
+            self._open_dashboard(host),
+            self._open_rtde(host),
+            return_exceptions=True
+        )
+
+        if isinstance(primary, BaseException):
+            if isinstance(primary, asyncio.TimeoutError):
+                print(f"[RobotClient] Connection to {host}:{port} timed out")
+            else:
+                print(f"[RobotClient] Connection failed: {primary}")
+            # Tear down whatever the secondary connections managed to open
+            await self.disconnect()
+            return False
+
+        self.connected = True
+        self.host = host
+        self.port = port
+        # Also covers a /connect without a prior disconnect(): never reuse another session's program name
+        self.loaded_program = None
+        self._loaded_program_dirty = True
+
+        # RTDE already provides joints, TCP pose and modes; the 30003 stream would only duplicate
+        # (and race) it at 125 Hz, so close it.
+        if self.rtde_connected and self.feedback_transport:
+            print("[RobotClient] RTDE active, closing redundant feedback connection")
+            self.feedback_transport.close()
+            self.feedback_transport = None
+            self.feedback_connected = False
+
+        self._pending_speed = None
+        self._speed_dirty.clear()
+        self._last_speed_send_ok = True
+        self._speed_flush_task = asyncio.create_task(self._speed_flusher())
+
+        # Start status poller (as fallback for RTDE or for richer info)
+        if self.dashboard_connected or self.feedback_connected:
+            self.status_poller_task = asyncio.create_task(self._status_poller())
+
+        # Pay the SSH handshake now, in the background, so the first program listing is fast
+        self._sftp_warmup_task = asyncio.create_task(self._warm_up_sftp())
+
+        print(f"[RobotClient] Fully connected to {host}")
+        return True
+
+    async def _open_primary(self, host: str, port: int):
+        """Primary command connection (usually 30002). Raises on failure."""
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), 
+            timeout=3.0
+        )
+
+    async def _open_feedback(self, host: str):
+        """Feedback connection (port 30003)."""
         try:
-            # 1. Primary command connection (usually 30002)
-            print(f"[RobotClient] Connecting to {host}:{port}...")
-            self.reader, self.writer = await asyncio.wait_for(
-                asyncio.open_connection(host, port), 
-                timeout=3.0
+            self._feedback_logged_info = False
+            loop = asyncio.get_running_loop()
+            self.feedback_transport, _ = await asyncio.wait_for(
+                loop.create_connection(lambda: FeedbackProtocol(self), host, 30003),
+                timeout=2.0
             )
-            self.connected = True
-            self.host = host
-            self.port = port
-            
-            # 2. Feedback connection (port 30003)
-            try:
-                self.feedback_reader, self.feedback_writer = await asyncio.wait_for(
-                    asyncio.open_connection(host, 30003), 
-                    timeout=2.0
-                )
-                self.feedback_connected = True
-                print(f"[RobotClient] Feedback connected on {host}:30003")
-            except Exception as fe:
-                print(f"[RobotClient] Feedback connection skipped/failed: {fe}")
-                self.feedback_connected = False
-
-            # 3. Dashboard connection (port 29999)
+            self.feedback_connected = True
+            print(f"[RobotClient] Feedback connected on {host}:30003")
+        except Exception as fe:
+            print(f"[RobotClient] Feedback connection skipped/failed: {fe}")
+            self.feedback_connected = False
+
+    async def _open_dashboard(self, host: str):
+        """Dashboard connection (port 29999)."""
+        try:
+            self.dashboard_reader, self.dashboard_writer = await asyncio.wait_for(
+                asyncio.open_connection(host, 29999),
+                timeout=2.0
+            )
+            self.dashboard_connected = True
+            self._dashboard_unread = 0
+            # Read initial banner
             try:
-                self.dashboard_reader, self.dashboard_writer = await asyncio.wait_for(
-                    asyncio.open_connection(host, 29999),
-                    timeout=2.0
-                )
-                self.dashboard_connected = True
-                # Read initial banner
-                try:
-                    await asyncio.wait_for(self.dashboard_reader.readuntil(b'\n'), timeout=1.0)
-                except: pass
-                print(f"[RobotClient] Dashboard connected on {host}:29999")
-            except Exception as de:
-                print(f"[RobotClient] Dashboard connection skipped/failed: {de}")
-                self.dashboard_connected = False
-
-            # 4. RTDE connection (Port 30004)
-            if RTDE_LIB_AVAILABLE:
-                try:
-                    print(f"[RobotClient] RTDE: Connecting to {host}:30004...")
-                    self.rtde_con = rtde.RTDE(host, 30004)
-                    await asyncio.to_thread(self.rtde_con.connect)
-                    
-                    if await self._rtde_handshake():
-                        self.rtde_connected = True
-                        print(f"[RobotClient] RTDE fully synchronized via library")
-                        # Start RTDE thread
-                        self.rtde_stop_event.clear()
-                        self.rtde_thread = threading.Thread(target=self._rtde_worker, daemon=True)
-                        self.rtde_thread.start()
-                    else:
-                        print("[RobotClient] RTDE library handshake failed")
-                        self.rtde_connected = False
-                        await asyncio.to_thread(self.rtde_con.disconnect)
-                except Exception as re:
-                    print(f"[RobotClient] RTDE library connection failed: {re}")
-                    self.rtde_connected = False
-            else:
-                print("[RobotClient] RTDE library not available, skipping RTDE.")
+                await asyncio.wait_for(self.dashboard_reader.readuntil(b'\n'), timeout=1.0)
+            except: pass
+            print(f"[RobotClient] Dashboard connected on {host}:29999")
+        except Exception as de:
+            print(f"[RobotClient] Dashboard connection skipped/failed: {de}")
+            self.dashboard_connected = False
 
-            # Start listener tasks
-            if self.feedback_connected:
-                self.feedback_task = asyncio.create_task(self._feedback_listener())
+    async def _open_rtde(self, host: str):
+        """RTDE connection (port 30004)."""
+        if not RTDE_LIB_AVAILABLE:
+            print("[RobotClient] RTDE library not available, skipping RTDE.")
+            return
 
+        try:
+            print(f"[RobotClient] RTDE: Connecting to {host}:30004...")
+            self.rtde_con = rtde.RTDE(host, 30004)
             
-            # Start status poller (as fallback for RTDE or for richer info)
-            if self.dashboard_connected or self.feedback_connected:
-                self.status_poller_task = asyncio.create_task(self._status_poller())
-
-            print(f"[RobotClient] Fully connected to {host}")
-            return True
-        except asyncio.TimeoutError:
-            print(f"[RobotClient] Connection to {host}:{port} timed out")
-            self.connected = False
-            return False
-        except Exception as e:
-            print(f"[RobotClient] Connection failed: {e}")
-            self.connected = False
-            return False
+            if await asyncio.get_running_loop().run_in_executor(self._rtde_exec, self._rtde_handshake):
+                self.rtde_connected = True
+                print(f"[RobotClient] RTDE fully synchronized via library")
+                self._start_rtde_reader()
+            else:
+                print("[RobotClient] RTDE library handshake failed")
+                self.rtde_connected = False
+        except Exception as re:
+            print(f"[RobotClient] RTDE library connection failed: {re}")
+            self.rtde_connected = False
 
     async def disconnect(self):
         """Disconnect from the robot."""
-        # Stop feedback listener
-        if self.feedback_task:
-            self.feedback_task.cancel()
-            try: await self.feedback_task
-            except: pass
-            self.feedback_task = None
-
         if self.status_poller_task:
             self.status_poller_task.cancel()
             try: await self.status_poller_task
             except: pass
             self.status_poller_task = None
 
+        if self._speed_flush_task:
+            self._speed_flush_task.cancel()
+            try: await self._speed_flush_task
+            except: pass
+            self._speed_flush_task = None
+
+        if self._feedback_reopen_task:
+            self._feedback_reopen_task.cancel()
+            try: await self._feedback_reopen_task
+            except: pass
+            self._feedback_reopen_task = None
+
+        with self._sftp_state_lock:
+            self._sftp_generation += 1
+        if self._sftp_warmup_task:
+            # A warm-up stuck on an unreachable or stalling port 22 must not hold up disconnect. Its
+            # executor thread may keep connecting, but it will drop the stale session (see _open_sftp)
+            self._sftp_warmup_task.cancel()
+            try: await self._sftp_warmup_task
+            except: pass
+            self._sftp_warmup_task = None
+
+        self._stop_rtde_reader()
+
         if self.rtde_thread:
             self.rtde_stop_event.set()
+            # Shut the socket down so a worker blocked in receive() returns now rather than at the library timeout
+            sock = getattr(self.rtde_con, "_RTDE__sock", None)
+            if sock is not None:
+                try: sock.shutdown(socket.SHUT_RDWR)
+                except OSError: pass
+            await asyncio.to_thread(self.rtde_thread.join, 1.0)
             self.rtde_thread = None
 
         if self.rtde_con:
-            try: await asyncio.to_thread(self.rtde_con.disconnect)
+            try: await asyncio.get_running_loop().run_in_executor(self._rtde_exec, self.rtde_con.disconnect)
             except: pass
             self.rtde_con = None
 
-        # Close all async writers
-        for w in [self.writer, self.feedback_writer, self.dashboard_writer]:
-            if w:
-                try:
-                    w.close()
-                    # We can't await wait_closed() here easily without a task if we want to be fast, 
-                    # but let's try to do it properly
-                except: pass
+        await self._close_sftp()
+
+        # Stop feedback stream
+        if self.feedback_transport:
+            self.feedback_transport.close()
+
+        # Close all async writers and wait for the sockets to actually close, so a quick
+        # reconnect doesn't race the old connections
+        writers = [w for w in (self.writer, self.dashboard_writer) if w]
+        for w in writers:
+            try: w.close()
+            except: pass
+        if writers:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*[w.wait_closed() for w in writers], return_exceptions=True),
+                    timeout=1.0
+                )
+            except asyncio.TimeoutError:
+                print("[RobotClient] Timed out waiting for sockets to close")
 
         self.connected = False
         self.feedback_connected = False
@@ -182,11 +501,13 @@ class RobotTCPClient:
         self.rtde_connected = False
         self.reader = None
         self.writer = None
-        self.feedback_reader = None
-        self.feedback_writer = None
+        self.feedback_transport = None
         self.dashboard_reader = None
         self.dashboard_writer = None
         self.latest_state = None
+        # The cached program name belongs to this robot; re-query after any reconnect
+        self.loaded_program = None
+        self._loaded_program_dirty = True
 
 
         print("[RobotClient] Disconnected")
@@ -224,6 +545,9 @@ class RobotTCPClient:
         
         async with self.dashboard_lock:
             try:
+                # Replies to earlier write-only commands would otherwise be read as this one's
+                await self._read_unread_dashboard_replies()
+
                 cmd = command.strip() + "\n"
                 self.dashboard_writer.write(cmd.encode())
                 await self.dashboard_writer.drain()
@@ -233,7 +557,7 @@ class RobotTCPClient:
                     self.dashboard_reader.readuntil(b'\n'),
                     timeout=2.0
                 )
-                resp_text = response.decode().strip()
+                resp_text = response.decode(errors="replace").strip()
                 print(f"[RobotClient] Dashboard: '{command}' -> '{resp_text}'")
                 return resp_text
             except Exception as e:
@@ -241,35 +565,138 @@ class RobotTCPClient:
                 self.dashboard_connected = False
                 return None
 
-    async def _setup_rtde_recipe(self, recipe_name: str, is_output: bool = True) -> Optional[any]:
-        """Robustly setup an RTDE recipe by filtering out unsupported fields."""
-        if not self.rtde_con or not self.rtde_config:
+    async def send_dashboard_multi(self, commands: list[str]) -> Optional[list[bytes]]:
+        """Send several Dashboard commands in one write and return their raw (stripped) responses, in order.
+
+        The server answers commands strictly in sequence, so pipelining them costs one round trip instead of one each.
+        Replies are left as bytes for callers that only match keywords; decode them where text is needed.
+        """
+        if not self.dashboard_connected or not self.dashboard_writer or not self.dashboard_reader:
             return None
-            
-        names, _ = self.rtde_config.get_recipe(recipe_name)
+
+        async with self.dashboard_lock:
+            try:
+                # Resync first: replies to earlier write-only commands would shift every response by one
+                await self._read_unread_dashboard_replies()
+
+                self.dashboard_writer.write(("\n".join(c.strip() for c in commands) + "\n").encode())
+                await self.dashboard_writer.drain()
+
+                responses = []
+                for command in commands:
+                    response = await asyncio.wait_for(
+                        self.dashboard_reader.readuntil(b'\n'),
+                        timeout=2.0
+                    )
+                    responses.append(response.strip())
+                print(f"[RobotClient] Dashboard: {commands} -> {[r.decode(errors='replace') for r in responses]}")
+                return responses
+            except Exception as e:
+                print(f"[RobotClient] Dashboard commands {commands} failed: {e}")
+                self.dashboard_connected = False
+                return None
+
+    async def _send_dashboard_write_only(self, command: str) -> bool:
+        """Send a Dashboard command without waiting for its reply.
+
+        The reply is left in the stream and consumed before the next command is sent.
+        """
+        if not self.dashboard_connected or not self.dashboard_writer:
+            return False
+
+        async with self.dashboard_lock:
+            try:
+                self.dashboard_writer.write((command.strip() + "\n").encode())
+                await self.dashboard_writer.drain()
+                self._dashboard_unread += 1
+                print(f"[RobotClient] Dashboard: '{command}' (reply not awaited)")
+                return True
+            except Exception as e:
+                print(f"[RobotClient] Dashboard command '{command}' failed: {e}")
+                self.dashboard_connected = False
+                return False
+
+    async def _read_unread_dashboard_replies(self) -> Optional[str]:
+        """Consume replies left by write-only commands and return the last one. Caller holds dashboard_lock."""
+        last = None
+        while self._dashboard_unread > 0:
+            response = await asyncio.wait_for(self.dashboard_reader.readuntil(b'\n'), timeout=2.0)
+            self._dashboard_unread -= 1
+            # A stray non-UTF-8 byte must not look like a broken connection
+            last = response.decode(errors="replace").strip()
+        return last
+
+    async def _wait_for_program_state(self, target: int, timeout: float) -> bool:
+        """Wait until the RTDE reader reports the given program_state; wakes on each state change."""
+        deadline = time.monotonic() + timeout
+        while self.program_state != target:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._program_state_changed.clear()
+            try:
+                await asyncio.wait_for(self._program_state_changed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return self.program_state == target
+        return True
+
+    async def _dashboard_transition_nowait(self, command: str, target_state: int) -> tuple[bool, str]:
+        """Issue a pause/stop without awaiting the reply and confirm it from the RTDE runtime state.
+
+        Only the failure path reads the Dashboard reply back, to report the robot's own message.
+        """
+        if not await self._send_dashboard_write_only(command):
+            return False, "No response from Dashboard"
+
+        if await self._wait_for_program_state(target_state, timeout=1.0):
+            return True, f"{command} confirmed by robot state"
+
+        try:
+            async with self.dashboard_lock:
+                result = await self._read_unread_dashboard_replies()
+        except Exception as e:
+            print(f"[RobotClient] Dashboard reply for '{command}' failed: {e}")
+            self.dashboard_connected = False
+            result = None
+
+        if result is None:
+            return False, "No response from Dashboard"
+        if _classify_reply(result, command) == "ok":
+            self.program_state = target_state
+            self.program_state_lock_until = time.monotonic() + 1.0
+            return True, result
+        return False, result
+
+    def _setup_rtde_recipe(self, recipe_name: str, names: list[str], is_output: bool = True) -> Optional[any]:
+        """Robustly setup an RTDE recipe by filtering out unsupported fields. Blocking."""
+        setup = self.rtde_con.send_output_setup if is_output else self.rtde_con.send_input_setup
+        cache_key = (self.rtde_con.hostname, recipe_name)
+
+        # Reuse the field list negotiated on a previous connection to this robot
+        cached_names = _negotiated_rtde_fields.get(cache_key)
+        if cached_names:
+            try:
+                res = setup(cached_names)
+                if res:
+                    return res
+            except Exception as e:
+                print(f"[RobotClient] RTDE recipe '{recipe_name}' cached setup failed: {e}. Renegotiating...")
         
         # Try full setup first (names only for flexibility)
         try:
-            if is_output:
-                res = await asyncio.to_thread(self.rtde_con.send_output_setup, names)
-            else:
-                res = await asyncio.to_thread(self.rtde_con.send_input_setup, names)
-            
+            res = setup(names)
             if res:
+                _negotiated_rtde_fields[cache_key] = names
                 return res
         except Exception as e:
             print(f"[RobotClient] RTDE recipe '{recipe_name}' full setup failed: {e}. Retrying with field-by-field discovery...")
 
-        # Field-by-field discovery
+        # Field-by-field discovery. The probes share one connection and the library is not
+        # thread-safe, so they have to run one after another.
         supported_names = []
         for name in names:
             try:
-                if is_output:
-                    success = await asyncio.to_thread(self.rtde_con.send_output_setup, [name])
-                else:
-                    success = await asyncio.to_thread(self.rtde_con.send_input_setup, [name])
-                
-                if success:
+                if setup([name]):
                     supported_names.append(name)
             except Exception:
                 # This field is likely not supported by this robot version
@@ -283,118 +710,287 @@ class RobotTCPClient:
         
         # Final setup with supported fields
         try:
-            if is_output:
-                return await asyncio.to_thread(self.rtde_con.send_output_setup, supported_names)
-            else:
-                return await asyncio.to_thread(self.rtde_con.send_input_setup, supported_names)
+            res = setup(supported_names)
+            if res:
+                _negotiated_rtde_fields[cache_key] = supported_names
+            return res
         except Exception as e:
             print(f"[RobotClient] RTDE final setup for '{recipe_name}' failed: {e}")
             return None
 
-    async def _rtde_handshake(self) -> bool:
-        """Perform RTDE handshake and setup recipes using the library."""
+    def _rtde_setup_and_start(self, recipes: dict) -> bool:
+        """Negotiate output/input recipes and start synchronization in a single worker-thread trip."""
+        # 1. Setup Outputs (Dynamic)
+        if not self._setup_rtde_recipe('state', recipes['state'][0], is_output=True):
+            print("[RobotClient] RTDE: Failed to setup outputs")
+            return False
+        negotiated = _negotiated_rtde_fields.get((self.rtde_con.hostname, 'state'), [])
+        if all(f in negotiated for f in _RTDE_STATE_FIELDS):
+            self._rtde_getter = operator.attrgetter(*_RTDE_STATE_FIELDS)
+        else:
+            self._rtde_getter = None
+            
+        # 2. Setup Inputs (Dynamic)
+        self.rtde_watch_input = self._setup_rtde_recipe('set_speed', recipes['set_speed'][0], is_output=False)
+        if not self.rtde_watch_input:
+            print("[RobotClient] RTDE: Input setup failed/skipped (speed slider control via RTDE may be disabled)")
+
+        # 3. Start synchronization
+        if not self.rtde_con.send_start():
+            print("[RobotClient] RTDE: Failed to start synchronization")
+            return False
+        return True
+
+    def _rtde_handshake(self) -> bool:
+        """Connect, negotiate recipes and start RTDE synchronization. Blocking.
+
+        The library calls are each only a short socket exchange, so the whole handshake runs in a
+        single trip to the RTDE executor instead of one thread hop per call.
+        """
         if not self.rtde_con:
             return False
         
         print("[RobotClient] Starting RTDE library handshake...")
         try:
+            self.rtde_con.connect()
+
             # 1. Get Controller Version
-            version = await asyncio.to_thread(self.rtde_con.get_controller_version)
+            version = self.rtde_con.get_controller_version()
             print(f"[RobotClient] RTDE: Connected to robot version: {version}")
 
-            # 2. Load config
-            config_path = os.path.join(os.getcwd(), "record_config.xml")
-            if not os.path.exists(config_path):
-                config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "record_config.xml")
+            # 2. Load config (parsed once per process)
+            recipes = load_rtde_recipes()
             
-            print(f"[RobotClient] RTDE: Using config at {config_path}")
-            self.rtde_config = rtde_config.ConfigFile(config_path)
-            
-            # 3. Setup Outputs (Dynamic)
-            if not await self._setup_rtde_recipe('state', is_output=True):
-                print("[RobotClient] RTDE: Failed to setup outputs")
-                return False
-                
-            # 4. Setup Inputs (Dynamic)
-            self.rtde_watch_input = await self._setup_rtde_recipe('set_speed', is_output=False)
-            if not self.rtde_watch_input:
-                print("[RobotClient] RTDE: Input setup failed/skipped (speed slider control via RTDE may be disabled)")
-
-            # 5. Start synchronization
-            if not await asyncio.to_thread(self.rtde_con.send_start):
-                print("[RobotClient] RTDE: Failed to start synchronization")
-                return False
-                
-            print("[RobotClient] RTDE library handshake complete")
-            return True
+            # 3. Setup recipes and start synchronization
+            if self._rtde_setup_and_start(recipes):
+                print("[RobotClient] RTDE library handshake complete")
+                return True
         except Exception as e:
             print(f"[RobotClient] RTDE library handshake error: {e}")
-            return False
+
+        try: self.rtde_con.disconnect()
+        except: pass
+        return False
+
+    def _start_rtde_reader(self):
+        """Read RTDE packages on the event loop when possible, otherwise in a worker thread."""
+        # The library keeps its socket private; only use it if this version exposes what we need
+        sock = getattr(self.rtde_con, "_RTDE__sock", None)
+        if sock is not None and hasattr(self.rtde_con, "receive_buffered") and hasattr(self.rtde_con, "_RTDE__buf"):
+            try:
+                asyncio.get_running_loop().add_reader(sock.fileno(), self._on_rtde_readable)
+                self._rtde_reader_fd = sock.fileno()
+                print("[RobotClient] RTDE: Reading packages on the event loop")
+                return
+            except NotImplementedError:
+                # e.g. the Windows proactor event loop has no add_reader
+                pass
+
+        print("[RobotClient] RTDE: Event loop reader unavailable, starting worker thread")
+        self.rtde_stop_event.clear()
+        self.rtde_thread = threading.Thread(target=self._rtde_worker, daemon=True)
+        self.rtde_thread.start()
+
+    def _stop_rtde_reader(self):
+        if self._rtde_reader_fd is not None:
+            try: asyncio.get_running_loop().remove_reader(self._rtde_reader_fd)
+            except Exception: pass
+            self._rtde_reader_fd = None
+
+    def _rtde_package_ready(self) -> Optional[bool]:
+        """Whether a whole data package is buffered (library buffer + socket); None if the socket hit EOF.
+
+        receive_buffered() keeps reading, with the library's blocking timeout, until it has a whole
+        data package, so the loop may only call it once one has fully arrived.
+        """
+        sock = self.rtde_con._RTDE__sock
+        try:
+            # The library gives its socket a timeout, and Python waits out that timeout before a recv
+            # on an empty socket (even with MSG_DONTWAIT), so confirm there is data without waiting
+            readable, _, _ = select.select([sock], [], [], 0)
+            if readable:
+                peeked = sock.recv(65536, socket.MSG_PEEK)
+                if not peeked:
+                    return None
+            else:
+                # Spurious wakeup: nothing new yet
+                peeked = b""
+        except (BlockingIOError, socket.timeout):
+            peeked = b""
+        except OSError:
+            return None
+        pending = bytes(self.rtde_con._RTDE__buf) + peeked
+
+        offset = 0
+        while len(pending) - offset >= _RTDE_HEADER_STRUCT.size:
+            size, command = _RTDE_HEADER_STRUCT.unpack_from(pending, offset)
+            if size < _RTDE_HEADER_STRUCT.size:
+                # Malformed; let the library deal with (and report) it
+                return True
+            if len(pending) - offset < size:
+                return False
+            if command == _RTDE_DATA_PACKAGE:
+                return True
+            offset += size
+        return False
+
+    def _resume_rtde_reader(self, fd: int):
+        if self._rtde_reader_fd == fd:
+            asyncio.get_running_loop().add_reader(fd, self._on_rtde_readable)
+
+    def _on_rtde_readable(self):
+        """Event loop callback for the RTDE socket; only parses once a whole data package has arrived."""
+        ready = self._rtde_package_ready()
+        if ready is False:
+            # The rest of the package is still in flight; pause the reader briefly instead of
+            # busy-looping on a socket that stays readable
+            fd = self._rtde_reader_fd
+            loop = asyncio.get_running_loop()
+            loop.remove_reader(fd)
+            loop.call_later(RTDE_PARTIAL_RETRY_DELAY, self._resume_rtde_reader, fd)
+            return
+
+        state = None
+        if ready:
+            try:
+                state = self.rtde_con.receive_buffered()
+            except Exception as e:
+                print(f"[RobotClient] RTDE reader error: {e}")
+
+        if state is None:
+            print("[RobotClient] RTDE: Connection lost, stopping reader")
+            self._stop_rtde_reader()
+            self._on_rtde_lost()
+            return
+
+        self._apply_rtde_state(state)
 
     def _rtde_worker(self):
-        """Dedicated thread for reading RTDE data packages."""
+        """Dedicated thread for reading RTDE data packages (fallback when the loop can't watch the socket).
+
+        The thread only receives; every state update is handed to the event loop, so client
+        attributes are only ever written from the loop thread.
+        """
         print("[RobotClient] Thread: Starting RTDE worker")
-        while not self.rtde_stop_event.is_set() and self.rtde_connected and self.rtde_con:
-            try:
-                state = self.rtde_con.receive()
-                if state is None:
-                    print("[RobotClient] RTDE: Received None, stopping worker")
+        loop = self._loop
+        try:
+            while not self.rtde_stop_event.is_set() and self.rtde_connected and self.rtde_con:
+                try:
+                    state = self.rtde_con.receive()
+                    if state is None:
+                        print("[RobotClient] RTDE: Received None, stopping worker")
+                        break
+                    loop.call_soon_threadsafe(self._apply_rtde_state, state)
+                except Exception as e:
+                    print(f"[RobotClient] RTDE worker error: {e}")
                     break
-                
-                # Update modes and speed
-                rm = getattr(state, 'robot_mode', None)
-                sm = getattr(state, 'safety_mode', None)
-                rs = getattr(state, 'output_runtime_state', None)
-                if rm is not None: self.robot_mode = rm
-                if sm is not None: self.safety_mode = sm
-                
-                # Map RTDE runtime_state to internal program_state
-                # RTDE: 0=stopped, 1=playing, 2=pausing, 3=paused, 4=resuming
-                # Internal: 0: STOPPED, 1: PLAYING, 2: PAUSED
-                if rs is not None and time.time() > self.program_state_lock_until:
-                    if rs == 0: self.program_state = 0
-                    elif rs in [1, 4]: self.program_state = 1
-                    elif rs in [2, 3]: self.program_state = 2
-                
-                # actual_TCP_pose
-                tcp_pose = getattr(state, 'actual_TCP_pose', None)
-                
-                # actual_q
-                q_actual = getattr(state, 'actual_q', None)
-                
-                # Robust Speed Handling:
-                # On some robots (v5.9), 'target_speed_fraction' represents the slider while 'speed_scaling'
-                # jumps to 1.0 when running. On others, it's the opposite.
-                # We prioritize the value that is "in the middle" (0.0 < val < 1.0) to avoid jumps to extremes.
-                ss = getattr(state, 'speed_scaling', None)
-                tsf = getattr(state, 'target_speed_fraction', None)
-                
-                if tsf is not None and 0.0 < tsf < 1.0:
-                    self.rtde_speed_slider = tsf
-                elif ss is not None and 0.0 < ss < 1.0:
-                    self.rtde_speed_slider = ss
-                else:
-                    # Fallback if both are at extremes (0.0, 1.0) or missing
-                    self.rtde_speed_slider = max(ss if ss is not None else 1.0, tsf if tsf is not None else 1.0)
-
-                # Update latest_state
-                if q_actual is not None and tcp_pose is not None:
-                    self.latest_state = {
-                        "joints": list(q_actual),
-                        "tcp_pose": list(tcp_pose),
-                        "tcp_offset": [0.0] * 6,
-                        "speed_slider": self.rtde_speed_slider,
-                        "timestamp": datetime.now().isoformat()
-                    }
 
+            loop.call_soon_threadsafe(self._on_rtde_worker_stopped)
+        except RuntimeError:
+            # Event loop already closed (interpreter shutdown)
+            pass
+        print("[RobotClient] Thread: RTDE worker stopped")
 
+    def _on_rtde_worker_stopped(self):
+        if self.rtde_stop_event.is_set():
+            # Stopped by disconnect(), not by losing the connection
+            self.rtde_connected = False
+        else:
+            self._on_rtde_lost()
 
-            except Exception as e:
-                print(f"[RobotClient] RTDE worker error: {e}")
-                break
-        
+    def _on_rtde_lost(self):
+        """RTDE dropped mid-session: stop serving its last packet and fall back to the 30003 stream."""
         self.rtde_connected = False
-        print("[RobotClient] Thread: RTDE worker stopped")
+        # read_state() falls back to the live mode attributes (kept fresh by the Dashboard poller)
+        # until feedback packets repopulate the state buffer
+        self.latest_state = None
+        if self.connected and self.host and not self.feedback_connected and not self._feedback_reopen_task:
+            print("[RobotClient] RTDE lost, reopening feedback connection")
+            self._feedback_reopen_task = asyncio.ensure_future(self._reopen_feedback(self.host))
+
+    async def _reopen_feedback(self, host: str):
+        try:
+            await self._open_feedback(host)
+        finally:
+            self._feedback_reopen_task = None
+
+    def _apply_rtde_state(self, state):
+        """Update modes, speed and latest_state from one RTDE data package."""
+        if self._rtde_getter:
+            # Every field was negotiated, so one attrgetter call fetches them all
+            rm, sm, rs, tcp_pose, q_actual, ss, tsf = self._rtde_getter(state)
+        else:
+            # Older firmware without some fields: the library's DataObject stores fields as plain
+            # instance attributes, so look each one up in its __dict__ with a default
+            fields = state.__dict__
+            rm = fields.get('robot_mode')
+            sm = fields.get('safety_mode')
+            rs = fields.get('output_runtime_state')
+            tcp_pose = fields.get('actual_TCP_pose')
+            q_actual = fields.get('actual_q')
+            ss = fields.get('speed_scaling', 1.0)
+            tsf = fields.get('target_speed_fraction', 1.0)
+
+        # Update modes and speed
+        if rm is not None: self.robot_mode = rm
+        if sm is not None: self.safety_mode = sm
+        
+        # Map RTDE runtime_state to internal program_state
+        # RTDE: 0=stopped, 1=playing, 2=pausing, 3=paused, 4=resuming
+        # Internal: 0: STOPPED, 1: PLAYING, 2: PAUSED
+        if rs is not None and time.monotonic() > self.program_state_lock_until:
+            if rs == 0: self.program_state = 0
+            elif rs == 1 or rs == 4: self.program_state = 1
+            elif rs == 2 or rs == 3: self.program_state = 2
+        
+        # Robust Speed Handling:
+        # On some robots (v5.9), 'target_speed_fraction' represents the slider while 'speed_scaling'
+        # jumps to 1.0 when running. On others, it's the opposite.
+        # We prioritize the value that is "in the middle" (0.0 < val < 1.0) to avoid jumps to extremes.
+        if 0.0 < tsf < 1.0:
+            self.rtde_speed_slider = tsf
+        elif 0.0 < ss < 1.0:
+            self.rtde_speed_slider = ss
+        else:
+            # Fallback if both are at extremes (0.0, 1.0) or missing
+            self.rtde_speed_slider = ss if ss > tsf else tsf
+
+        # Update latest_state
+        if q_actual is not None and tcp_pose is not None:
+            self._publish_state(q_actual, tcp_pose)
+
+    def _publish_state(self, joints, tcp_pose):
+        """Write a state update into the preallocated state buffer and publish it.
+
+        Updates identical to the previous one (an idle robot) are skipped, so timestamp_ns is the
+        time of the last change.
+        """
+        state = self._state_buf
+        if (
+            joints == self._last_joints and tcp_pose == self._last_tcp_pose
+            and self.latest_state is state
+            and state["speed_slider"] == self.rtde_speed_slider
+            and state["robot_mode"] == self.robot_mode
+            and state["safety_mode"] == self.safety_mode
+            and state["program_state"] == self.program_state
+            and state["loaded_program"] == self.loaded_program
+        ):
+            return
+        self._last_joints = joints
+        self._last_tcp_pose = tcp_pose
+
+        jb = self._joints_buf
+        jb[0], jb[1], jb[2], jb[3], jb[4], jb[5] = joints
+        tb = self._tcp_buf
+        tb[0], tb[1], tb[2], tb[3], tb[4], tb[5] = tcp_pose
+
+        state["speed_slider"] = self.rtde_speed_slider
+        state["robot_mode"] = self.robot_mode
+        state["safety_mode"] = self.safety_mode
+        state["program_state"] = self.program_state
+        state["loaded_program"] = self.loaded_program
+        state["timestamp_ns"] = time.time_ns()  # Formatted for display by the consumer, not per packet
+        self.latest_state = state
 
     async def _send_rtde_package(self, p_type: int, payload: bytes):
         pass # No longer used
@@ -408,99 +1004,138 @@ class RobotTCPClient:
     # Removed _rtde_listener as it's replaced by _rtde_worker thread
 
     async def set_robot_speed(self, fraction: float) -> bool:
-        """Set the speed slider using RTDE (falling back to URScript if RTDE fails)."""
+        """Set the speed slider using RTDE (falling back to URScript if RTDE is unavailable).
+
+        While connected the value is only queued: slider drags fire many updates, and the flusher
+        sends just the latest one. The return value then says whether the flusher's last send was
+        delivered, so a robot that stopped accepting speed commands is still reported as a failure.
+        """
         safe_fraction = max(0.0, min(1.0, fraction))
         self.rtde_speed_slider = safe_fraction
         
         print(f"[RobotClient] Setting speed slider to {safe_fraction*100:.1f}%")
-        
-        if self.rtde_connected and self.rtde_con and self.rtde_watch_input:
+
+        if self._speed_flush_task:
+            self._pending_speed = safe_fraction
+            self._speed_dirty.set()
+            return self._last_speed_send_ok
+
+        # Not connected yet; try directly so the caller gets the real result
+        return await self._send_speed(safe_fraction)
+
+    def _rtde_speed_available(self) -> bool:
+        # Check if fields exist on negotiated recipe
+        return bool(
+            self.rtde_connected and self.rtde_con and self.rtde_watch_input
+            and hasattr(self.rtde_watch_input, 'speed_slider_mask')
+            and hasattr(self.rtde_watch_input, 'speed_slider_fraction')
+        )
+
+    async def _send_speed(self, fraction: float) -> bool:
+        if self._rtde_speed_available():
             try:
-                # Check if fields exist on negotiated recipe
-                if hasattr(self.rtde_watch_input, 'speed_slider_mask') and hasattr(self.rtde_watch_input, 'speed_slider_fraction'):
-                    # Prepare input data
-                    self.rtde_watch_input.speed_slider_mask = 1
-                    self.rtde_watch_input.speed_slider_fraction = safe_fraction
-                    # Send
-                    await asyncio.to_thread(self.rtde_con.send, self.rtde_watch_input)
-                    print(f"[RobotClient] Speed command sent via RTDE")
-                    return True
-                else:
-                    print(f"[RobotClient] RTDE: Speed slider fields not supported by this robot. Falling back to URScript.")
+                # Prepare input data
+                self.rtde_watch_input.speed_slider_mask = 1
+                self.rtde_watch_input.speed_slider_fraction = fraction
+                # A single small package write; cheaper inline than a thread-pool hop
+                self.rtde_con.send(self.rtde_watch_input)
+                print(f"[RobotClient] Speed command sent via RTDE ({fraction*100:.1f}%)")
+                return True
             except Exception as e:
                 print(f"[RobotClient] RTDE speed command failed: {e}. Falling back to URScript.")
-        
+        elif self.rtde_connected:
+            print(f"[RobotClient] RTDE: Speed slider fields not supported by this robot. Falling back to URScript.")
+
         # Fallback to URScript
-        script = f"set_speed_slider_fraction({safe_fraction})"
-        return await self.send_command(script)
+        return await self.send_command(f"set_speed_slider_fraction({fraction})")
+
+    async def _speed_flusher(self):
+        """Background task that sends the most recent queued speed slider value."""
+        while self.connected:
+            await self._speed_dirty.wait()
+            # Let further slider updates arrive so intermediate values are dropped
+            interval = RTDE_SPEED_FLUSH_INTERVAL if self._rtde_speed_available() else SCRIPT_SPEED_FLUSH_INTERVAL
+            await asyncio.sleep(interval)
+            self._speed_dirty.clear()
+            fraction, self._pending_speed = self._pending_speed, None
+            if fraction is not None:
+                self._last_speed_send_ok = await self._send_speed(fraction)
+                if not self._last_speed_send_ok:
+                    print(f"[RobotClient] Queued speed command ({fraction*100:.1f}%) could not be delivered")
 
     def is_connected(self) -> bool:
         return self.connected
 
     async def read_state(self) -> Optional[dict]:
-        """Return the latest parsed robot state."""
-        if self.latest_state:
-            state = self.latest_state.copy()
-            state["robot_mode"] = self.robot_mode
-            state["safety_mode"] = self.safety_mode
-            state["program_state"] = self.program_state
-            state["loaded_program"] = self.loaded_program
-            return state
+        """Return a snapshot of the latest parsed robot state; callers may keep or modify it.
+
+        joints and tcp_pose are float64 array('d') copies (usable with the buffer protocol, e.g.
+        numpy.frombuffer); convert them to lists at the serialization boundary.
+        """
+        snap = self.latest_state
+        if snap:
+            return {
+                **snap,
+                "joints": array.array('d', snap["joints"]),
+                "tcp_pose": array.array('d', snap["tcp_pose"]),
+                "tcp_offset": list(snap["tcp_offset"])
+            }
         
         # Fallback if feedback hasn't arrived yet but we are connected
         if self.connected:
              return {
-                "joints": [0.0]*6,
-                "tcp_pose": [0.0]*6,
+                "joints": array.array('d', [0.0]*6),
+                "tcp_pose": array.array('d', [0.0]*6),
                 "tcp_offset": [0.0]*6,
                 "speed_slider": self.rtde_speed_slider,
                 "robot_mode": self.robot_mode,
                 "safety_mode": self.safety_mode,
                 "program_state": self.program_state,
                 "loaded_program": self.loaded_program,
-                "timestamp": datetime.now().isoformat()
+                "timestamp_ns": time.time_ns()
             }
         return None
 
     async def _status_poller(self):
         """Fallback poller to get robot status via Dashboard if RTDE is not providing it."""
         print("[RobotClient] Starting status poller task")
+        last_program_state = self.program_state
         while self.connected:
             try:
-                if self.dashboard_connected:
+                # A user command holding the Dashboard lock may be waiting on a slow reply; skip this
+                # round instead of queueing status queries behind it (and user commands behind those)
+                if self.dashboard_connected and not self.dashboard_lock.locked():
                     # 1. Status Polling (Fallback for RTDE)
                     if not self.rtde_connected:
+                        # All three queries go out in a single write and round trip
+                        responses = await self.send_dashboard_multi(["robotmode", "programState", "safetystatus"])
+                        mode_resp, prog_resp, safety_resp = responses or (None, None, None)
+
                         # 1a. Robot Mode
-                        mode_resp = await self.send_dashboard_command("robotmode")
-                        if mode_resp and "robotmode:" in mode_resp.lower():
-                            low_mode = mode_resp.lower()
-                            if "running" in low_mode: self.robot_mode = 7
-                            elif "idle" in low_mode: self.robot_mode = 5
-                            elif "power_on" in low_mode: self.robot_mode = 4
-                            elif "power_off" in low_mode: self.robot_mode = 3
-                            elif "booting" in low_mode: self.robot_mode = 2
-                            elif "confirm_safety" in low_mode: self.robot_mode = 1
-                            elif "disconnected" in low_mode: self.robot_mode = 0
+                        if mode_resp and b"robotmode:" in mode_resp.lower():
+                            m = _ROBOT_MODE_RE.search(mode_resp.lower())
+                            if m: self.robot_mode = _ROBOT_MODE_MAP[m.group()]
 
                         # 1b. Program State
-                        prog_resp = await self.send_dashboard_command("programState")
                         if prog_resp:
-                            low_prog = prog_resp.lower()
-                            if "playing" in low_prog: self.program_state = 1
-                            elif "paused" in low_prog: self.program_state = 2
-                            elif "stopped" in low_prog: self.program_state = 0
+                            m = _PROGRAM_STATE_RE.search(prog_resp.lower())
+                            if m: self.program_state = _PROGRAM_STATE_MAP[m.group()]
                         
                         # 1c. Safety Status
-                        safety_resp = await self.send_dashboard_command("safetystatus")
-                        if safety_resp and "safetystatus:" in safety_resp.lower():
-                            if "PROTECTIVE_STOP" in safety_resp: self.safety_mode = 3
-                            elif "EMERGENCY_STOP" in safety_resp: self.safety_mode = 4
-                            elif "NORMAL" in safety_resp: self.safety_mode = 1
+                        if safety_resp and b"safetystatus:" in safety_resp.lower():
+                            m = _SAFETY_MODE_RE.search(safety_resp)
+                            if m: self.safety_mode = _SAFETY_MODE_MAP[m.group()]
 
-                    # 2. Program Name (ALWAYS poll this as it's not available in RTDE)
-                    self.loaded_program = await self.get_loaded_program()
+                    # A program started/stopped (possibly from the pendant) may mean a different program is loaded
+                    if self.program_state != last_program_state:
+                        last_program_state = self.program_state
+                        self._loaded_program_dirty = True
 
-                await asyncio.sleep(2.0) # Poll every 2 seconds (dashboard is slow)
+                    # 2. Program Name (not available in RTDE); served from cache unless it is stale
+                    await self.get_loaded_program()
+
+                # Poll every 2 seconds (dashboard is slow); with RTDE only the program name is polled here
+                await asyncio.sleep(STATUS_POLL_INTERVAL_RTDE if self.rtde_connected else STATUS_POLL_INTERVAL)
             except Exception as e:
                 print(f"[RobotClient] Status poller error: {e}")
                 await asyncio.sleep(5.0)
@@ -509,342 +1144,282 @@ class RobotTCPClient:
     # Constants for tracking the speed offset once found
     _speed_offset_cache = None
 
-    async def _feedback_listener(self):
-        """Background task that continuously reads and parses robot state."""
-        print("[RobotClient] Starting feedback listener")
-        packet_count = 0
-        logged_info = False
-        
-        while self.feedback_connected and self.feedback_reader:
+    def _on_feedback_packet(self, data: bytearray, offset: int, length: int):
+        """Parse one complete 30003 frame starting at `offset` in FeedbackProtocol's buffer."""
+        if self.rtde_connected:
+            return
+
+        if not self._feedback_logged_info:
+            print(f"[RobotClient] Robot Type: {'e-Series' if length >= 1108 else 'CB3'}, Length: {length}")
+            self._feedback_logged_info = True
+
+        if length >= _FEEDBACK_MIN_LENGTH:
+            fields = _FEEDBACK_FIELDS_STRUCT.unpack_from(data, offset + _FEEDBACK_Q_OFFSET)
+            q_actual = fields[:6]
+            tcp_actual = fields[6:]
+
+            # URSim 5.12.6 does not transmit speed slider in 30003 feedback
+            # We keep the last speed value the user set via the UI (or the one reported by RTDE)
+            self._publish_state(q_actual, tcp_actual)
+
+    def _open_sftp(self, channels: int, generation: int) -> list[paramiko.SFTPClient]:
+        """Return `channels` cached SFTP clients, (re)opening the SSH session if needed. Blocking.
+
+        Each SFTPClient is its own channel on the shared SSH transport, so they can be used from separate threads.
+        `generation` is _sftp_generation at call time; if disconnect() has run since, nothing is cached.
+        """
+        if self._ssh:
+            transport = self._ssh.get_transport()
+            if self._sftp_host != self.host:
+                print(f"[RobotClient] SFTP: Cached session belongs to {self._sftp_host}, reconnecting...")
+                self._close_sftp_sync()
+            elif not transport or not transport.is_active():
+                print("[RobotClient] SFTP: Cached session is no longer active, reconnecting...")
+                self._close_sftp_sync()
+
+        if not self._ssh:
+            host = self.host
+            print(f"[RobotClient] SFTP: Connecting to {host}:22...")
+            ssh = paramiko.SSHClient()
+            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
             try:
                 try:
-                    header = await self.feedback_reader.readexactly(4)
-                except Exception: break
-                
-                length = struct.unpack('!i', header)[0]
-                if not logged_info:
-                    print(f"[RobotClient] Robot Type: {'e-Series' if length >= 1108 else 'CB3'}, Length: {length}")
-                    logged_info = True
-                
-                try:
-                    data = header + await self.feedback_reader.readexactly(length - 4)
-                except Exception: break
-                
-                packet_count += 1
-                if packet_count % 5 != 0:
-                    await asyncio.sleep(0)
-                    continue
+                    ssh.connect(host, port=22, username=self.ftp_user, password=self.ftp_password, **SFTP_CONNECT_TIMEOUTS)
+                except paramiko.AuthenticationException:
+                    if self.ftp_user != "root":
+                        raise
+                    print(f"[RobotClient] SFTP: Authentication failed for 'root', trying 'universal-robots'...")
+                    ssh.connect(host, port=22, username="universal-robots", password=self.ftp_password, **SFTP_CONNECT_TIMEOUTS)
+            except Exception:
+                ssh.close()
+                raise
+            # Keepalives stop the robot (or a NAT in between) from silently dropping the idle session
+            ssh.get_transport().set_keepalive(SFTP_KEEPALIVE_INTERVAL)
+            with self._sftp_state_lock:
+                stale = generation != self._sftp_generation
+                if not stale:
+                    self._ssh = ssh
+                    self._sftp_host = host
+            if stale:
+                ssh.close()
+                raise RuntimeError(f"SFTP session to {host} outlived its connection, discarded")
+
+        ssh = self._ssh
+        while len(self._sftp_channels) < channels:
+            sftp = ssh.open_sftp()
+            with self._sftp_state_lock:
+                stale = generation != self._sftp_generation
+                if not stale:
+                    self._sftp_channels.append(sftp)
+            if stale:
+                sftp.close()
+                raise RuntimeError("SFTP channel outlived its connection, discarded")
+        return self._sftp_channels[:channels]
 
-                if length >= 444 + 48:
-                    q_actual = struct.unpack('!6d', data[252:252+48])
-                    tcp_actual = struct.unpack('!6d', data[444:444+48])
-                    
-                    speed_slider = self.rtde_speed_slider
-                    
-                    if not self.rtde_connected:
-                        # URSim 5.12.6 does not transmit speed slider in 30003 feedback
-                        # We keep the last speed value the user set via the UI
-                        speed_slider = self.rtde_speed_slider
-
-                    self.latest_state = {
-                        "joints": list(q_actual),
-                        "tcp_pose": list(tcp_actual),
-                        "tcp_offset": [0.0] * 6,
-                        "speed_slider": speed_slider,
-                        "timestamp": datetime.now().isoformat()
-                    }
+    def _close_sftp_sync(self):
+        for sftp in self._sftp_channels:
+            try: sftp.close()
+            except: pass
+        if self._ssh:
+            try: self._ssh.close()
+            except: pass
+        self._sftp_channels = []
+        self._ssh = None
+        self._sftp_host = None
+
+    async def _close_sftp(self):
+        """Close the cached SSH/SFTP session (called on disconnect)."""
+        async with self._sftp_lock:
+            if self._ssh or self._sftp_channels:
+                await asyncio.get_running_loop().run_in_executor(self._sftp_pool, self._close_sftp_sync)
+
+    async def _warm_up_sftp(self):
+        """Open the SSH session and SFTP channels ahead of the first list_programs call."""
+        async with self._sftp_lock:
+            try:
+                await asyncio.get_running_loop().run_in_executor(self._sftp_pool, self._open_sftp, len(PROGRAM_SEARCH_DIRS), self._sftp_generation)
+            except Exception as e:
+                # Not fatal: list_programs retries the connection on demand
+                print(f"[RobotClient] SFTP: Warm-up failed: {e}")
 
-                    
-                    # if packet_count % 125 == 0:
-                    #     if self.rtde_connected:
-                    #         print(f"[RobotClient] Update [RTDE]: J1={q_actual[0]:.2f}, Speed={speed_slider*100:.1f}%")
-                    #     else:
-                    #         print(f"[RobotClient] Update: J1={q_actual[0]:.2f}, TCPz={tcp_actual[2]:.2f}")
+    @staticmethod
+    def _list_urp(sftp: paramiko.SFTPClient, target_dir: str) -> list[str]:
+        try:
+            files = sftp.listdir(target_dir)
+        except IOError:
+            # Some dirs might not exist or be accessible, that's fine
+            return []
+        program_files = [f for f in files if f.endswith('.urp')]
+        if program_files:
+            print(f"[RobotClient] SFTP: Found {len(program_files)} programs in '{target_dir}'")
+        return program_files
 
-                
-                await asyncio.sleep(0)
-            except Exception as e:
-                print(f"[RobotClient] Feedback loop error: {e}")
-                await asyncio.sleep(1)
-                
-        self.feedback_connected = False
     async def list_programs(self) -> list[str]:
-        """List .urp programs via SFTP with better robustness."""
+        """List .urp programs via SFTP, probing all search directories concurrently over one SSH session."""
         if not self.host:
              return []
-        
-        def _sftp_list():
-            programs = []
-            ssh = None
+
+        # The lock keeps callers from sharing channels (paramiko's SFTPClient is not thread-safe)
+        loop = asyncio.get_running_loop()
+        async with self._sftp_lock:
             try:
-                print(f"[RobotClient] SFTP: Connecting to {self.host}:22...")
-                ssh = paramiko.SSHClient()
-                ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                try:
-                    ssh.connect(self.host, port=22, username=self.ftp_user, password=self.ftp_password, timeout=5.0)
-                except paramiko.AuthenticationException:
-                    if self.ftp_user == "root":
-                        print(f"[RobotClient] SFTP: Authentication failed for 'root', trying 'universal-robots'...")
-                        ssh.connect(self.host, port=22, username="universal-robots", password=self.ftp_password, timeout=5.0)
-                    else:
-                        raise
-                
-                sftp = ssh.open_sftp()
-                
-                # List of potential directories where programs might be stored
-                search_dirs = ["/programs", "/root/programs", "/home/root", "/"]
-                
-                for target_dir in search_dirs:
-                    try:
-                        print(f"[RobotClient] SFTP: Trying directory '{target_dir}'")
-                        files = sftp.listdir(target_dir)
-                        program_files = [f for f in files if f.endswith('.urp')]
-                        if program_files:
-                            print(f"[RobotClient] SFTP: Found {len(program_files)} programs in '{target_dir}'")
-                            programs.extend(program_files)
-                    except Exception as e:
-                        # Some dirs might not exist or be accessible, that's fine
-                        continue
-                
-                sftp.close()
-                ssh.close()
-                # Remove duplicates if any
-                programs = list(set(programs))
+                channels = await loop.run_in_executor(self._sftp_pool, self._open_sftp, len(PROGRAM_SEARCH_DIRS), self._sftp_generation)
+                results = await asyncio.gather(
+                    *[loop.run_in_executor(self._sftp_pool, self._list_urp, sftp, d) for sftp, d in zip(channels, PROGRAM_SEARCH_DIRS)],
+                    return_exceptions=True
+                )
             except Exception as e:
                 print(f"[RobotClient] SFTP global operations failed: {e}")
-                if ssh:
-                    ssh.close()
+                await loop.run_in_executor(self._sftp_pool, self._close_sftp_sync)
+                return []
+
+            # A set drops programs found in more than one directory
+            programs = set()
+            session_broken = False
+            for target_dir, result in zip(PROGRAM_SEARCH_DIRS, results):
+                if isinstance(result, Exception):
+                    print(f"[RobotClient] SFTP: Listing '{target_dir}' failed: {result}")
+                    session_broken = True
+                    continue
+                programs.update(result)
+
+            if session_broken:
+                # Drop the session so the next call starts from a clean handshake
+                await loop.run_in_executor(self._sftp_pool, self._close_sftp_sync)
+
             return sorted(programs)
 
-        return await asyncio.to_thread(_sftp_list)
+    async def _poll_dashboard_until(self, command: str, accept, timeout: float = 2.0) -> Optional[str]:
+        """Re-issue a Dashboard query until accept(lowercased reply) holds; return that reply, or None on timeout."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            result = await self.send_dashboard_command(command)
+            if result is None:
+                return None
+            if accept(result.lower()):
+                return result
+            await asyncio.sleep(0.1)
+        return None
 
     async def load_program(self, program_name: str) -> tuple[bool, str]:
-        """Load a program via Dashboard server. Returns (success, message)."""
+        """Load a program via Dashboard server. Returns (success, message).
+
+        The command is sent once; an ambiguous reply (banner or stale state echo) is resolved by
+        querying the loaded program instead of re-sending the load.
+        """
         if not self.dashboard_connected:
             return False, "Not connected to Dashboard"
-        
-        last_result = ""
-        # Try up to 3 times to handle stale responses
-        for attempt in range(3):
-            result = await self.send_dashboard_command(f"load {program_name}")
-            if result is None:
-                return False, "No response from Dashboard"
-            
-            last_result = result
-            low_res = result.lower()
 
-            # Handle explicit errors
-            if "remote control mode is disabled" in low_res:
-                return False, result
-            
-            if "failed to execute" in low_res:
-                if "load" in low_res:
-                    return False, result
-                if attempt < 2:
-                    await asyncio.sleep(0.1)
-                    continue
-                return False, result
-            
-            # Check for other errors
-            if "file not found" in low_res or "error" in low_res or "failed" in low_res:
-                return False, result
-            
-            # Ignore connection banners
-            if "connected:" in low_res or "dashboard server" in low_res:
-                if attempt < 2:
-                    await asyncio.sleep(0.1)
-                    continue
-                return False, result
-            
-            # Reject stale state messages (from previous commands)
-            stale_states = ["pausing", "paused", "stopped", "stopping", "starting", "playing"]
-            if any(state in low_res for state in stale_states) and "loading" not in low_res:
-                if attempt < 2:
-                    await asyncio.sleep(0.1)
-                    continue
-                return False, result
-            
-            # Accept loading/loaded responses
-            if "loading" in low_res or "loaded" in low_res:
-                self.loaded_program = program_name
-                return True, result
-        
-        return False, last_result
+        result = await self.send_dashboard_command(f"load {program_name}")
+        if result is None:
+            return False, "No response from Dashboard"
+        kind = _classify_reply(result, "load")
 
-    async def play_program(self) -> tuple[bool, str]:
-        """Start or Resume loaded program via Dashboard server. Returns (success, message)."""
+        # Accept loading/loaded responses
+        if kind == "ok":
+            self.loaded_program = program_name
+            self._loaded_program_dirty = True
+            return True, result
+        # Handle explicit errors
+        if kind in _REPLY_FAILURES:
+            return False, result
+
+        # Anything else is a connection banner or a stale state message from a previous command
+        file_name = program_name.rsplit("/", 1)[-1].lower()
+        confirmed = await self._poll_dashboard_until("get loaded program", lambda r: file_name in r)
+        if confirmed is None:
+            return False, result
+        self.loaded_program = program_name
+        self._loaded_program_dirty = True
+        return True, confirmed
+
+    async def _dashboard_transition(self, command: str) -> tuple[bool, str]:
+        """Send play/pause/stop once and confirm an ambiguous reply from the program state.
+
+        A banner, a stale state echo or URSim 5.12.6's "Loading program..." reply to play is resolved
+        by waiting for the target state (from RTDE when available, otherwise via programState queries).
+        """
         if not self.dashboard_connected:
             return False, "Not connected to Dashboard"
-        
-        last_result = ""
-        # Try up to 3 times to handle stale responses and echoes
-        for attempt in range(3):
-            result = await self.send_dashboard_command("play")
-            if result is None:
-                return False, "No response from Dashboard"
-                
-            last_result = result
-            low_res = result.lower()
-
-            # Handle explicit errors
-            if "remote control mode is disabled" in low_res:
-                return False, result
-
-            if "failed to execute" in low_res:
-                if "play" in low_res:
-                    return False, result
-                if attempt < 2:
-                    await asyncio.sleep(0.1)
-                    continue
-                return False, result
-            
-            # Check for other errors
-            if "error" in low_res or "failed" in low_res:
-                return False, result
-            
-            # Ignore connection banners
-            if "connected:" in low_res or "dashboard server" in low_res:
-                if attempt < 2:
-                    await asyncio.sleep(0.1)
-                    continue
-                return False, result
+        target_state, state_word, nowait = _TRANSITIONS[command]
 
-            # Stale rejection: if we see "stopped", "pausing", "paused", it's definitely stale
-            if any(x in low_res for x in ["stopped", "stopping", "paused", "pausing"]):
-                 if attempt < 2:
-                    await asyncio.sleep(0.1)
-                    continue
-                 return False, result
-            
-            # URSim 5.12.6 quirk: "Loading program..." might come back.
-            # If it's the FIRST attempt, it's likely a stale echo of the 'load' command. Retry.
-            if "loading" in low_res:
-                if attempt == 0:
-                    await asyncio.sleep(0.2) # Wait a bit longer
-                    continue
-                # If it persists on subsequent attempts, assume it's the quirk and accept it
-                return True, result
+        # RTDE reports the runtime state every cycle, so there is no need to parse the reply
+        if nowait and self.rtde_connected:
+            return await self._dashboard_transition_nowait(command, target_state)
 
-            if any(x in low_res for x in ["starting", "playing", "started"]):
-                self.program_state = 1
-                self.program_state_lock_until = time.time() + 1.0
+        result = await self.send_dashboard_command(command)
+        if result is None:
+            return False, "No response from Dashboard"
+        kind = _classify_reply(result, command)
+
+        if kind == "ok":
+            self.program_state = target_state
+            self.program_state_lock_until = time.monotonic() + 1.0
+            return True, result
+        # Handle explicit errors
+        if kind in _REPLY_FAILURES:
+            return False, result
+
+        if self.rtde_connected:
+            if await self._wait_for_program_state(target_state, timeout=2.0):
                 return True, result
-            
-            # Retry if we got something else unknown
-            if attempt < 2:
-                await asyncio.sleep(0.1)
-                continue
-        
-        return False, last_result
+            return False, result
+
+        confirmed = await self._poll_dashboard_until("programState", lambda r: state_word in r)
+        if confirmed is None:
+            return False, result
+        self.program_state = target_state
+        self.program_state_lock_until = time.monotonic() + 1.0
+        return True, confirmed
+
+    async def _run_coalesced(self, key: str, factory):
+        """Run factory() once for all concurrent callers with the same key; they all get its result.
+
+        A caller being cancelled does not cancel the shared operation for the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
 
+    async def play_program(self) -> tuple[bool, str]:
+        """Start or Resume loaded program via Dashboard server. Returns (success, message)."""
+        success, msg = await self._run_coalesced("play", lambda: self._dashboard_transition("play"))
+        if success:
+            self._loaded_program_dirty = True
+        return success, msg
 
     async def pause_program(self) -> tuple[bool, str]:
         """Pause program via Dashboard server. Returns (success, message)."""
-        if not self.dashboard_connected:
-            return False, "Not connected to Dashboard"
-        
-        last_result = ""
-        # Try up to 3 times to handle stale responses
-        for attempt in range(3):
-            result = await self.send_dashboard_command("pause")
-            if result is None:
-                return False, "No response from Dashboard"
-                
-            last_result = result
-            low_res = result.lower()
-
-            # Handle explicit errors
-            if "remote control mode is disabled" in low_res:
-                return False, result
-
-            if "failed to execute" in low_res:
-                if "pause" in low_res:
-                    return False, result
-                if attempt < 2:
-                    await asyncio.sleep(0.1)
-                    continue
-                return False, result
-
-            if "error" in low_res or "failed" in low_res:
-                return False, result
-
-            # Ignore connection banners
-            if "connected:" in low_res or "dashboard server" in low_res:
-                if attempt < 2:
-                    await asyncio.sleep(0.1)
-                    continue
-                return False, result
-            
-            # Accept pausing/paused responses
-            if any(x in low_res for x in ["pausing", "paused"]):
-                self.program_state = 2
-                self.program_state_lock_until = time.time() + 1.0
-                return True, result
-            
-            # Retry if we got a stale state like "starting", "playing", "loading", "stopped"
-            if attempt < 2:
-                await asyncio.sleep(0.1)
-                continue
-        
-        return False, last_result
+        return await self._run_coalesced("pause", lambda: self._dashboard_transition("pause"))
 
     async def stop_program(self) -> tuple[bool, str]:
         """Stop program via Dashboard server. Returns (success, message)."""
-        if not self.dashboard_connected:
-            return False, "Not connected to Dashboard"
-        
-        last_result = ""
-        # Try up to 3 times to handle stale responses
-        for attempt in range(3):
-            result = await self.send_dashboard_command("stop")
-            if result is None:
-                return False, "No response from Dashboard"
-                
-            last_result = result
-            low_res = result.lower()
-
-            # Handle explicit errors
-            if "remote control mode is disabled" in low_res:
-                return False, result
-
-            if "failed to execute" in low_res:
-                if "stop" in low_res:
-                    return False, result
-                if attempt < 2:
-                    await asyncio.sleep(0.1)
-                    continue
-                return False, result
-
-            if "error" in low_res or "failed" in low_res:
-                return False, result
-
-            # Ignore connection banners
-            if "connected:" in low_res or "dashboard server" in low_res:
-                if attempt < 2:
-                    await asyncio.sleep(0.1)
-                    continue
-                return False, result
-            
-            # Accept stopped/stopping responses
-            if any(x in low_res for x in ["stopped", "stopping"]):
-                self.program_state = 0
-                self.program_state_lock_until = time.time() + 1.0
-                return True, result
-            
-            # Retry if we got a stale state like "starting", "playing", "loading", "paused"
-            if attempt < 2:
-                await asyncio.sleep(0.1)
-                continue
-        
-        return False, last_result
+        success, msg = await self._run_coalesced("stop", lambda: self._dashboard_transition("stop"))
+        if success:
+            self._loaded_program_dirty = True
+        return success, msg
 
     async def get_loaded_program(self) -> Optional[str]:
-        """Get the path of the currently loaded program."""
+        """Get the path of the currently loaded program.
+
+        The answer is cached; the Dashboard is only re-queried after a load/play/stop, a program
+        state change, or once the cached value is older than the refresh interval.
+        """
+        if not self._loaded_program_dirty and time.monotonic() - self._loaded_program_checked_at < LOADED_PROGRAM_REFRESH_INTERVAL:
+            return self.loaded_program
         if not self.dashboard_connected:
             return None
         result = await self.send_dashboard_command("get loaded program")
-        if result and "Loaded program:" in result:
-            return result.replace("Loaded program:", "").strip()
+        if result is None:
+            return None
+        if "Loaded program:" in result:
+            result = result.replace("Loaded program:", "").strip()
+        self.loaded_program = result
+        self._loaded_program_dirty = False
+        self._loaded_program_checked_at = time.monotonic()
         return result
 
     async def unlock_protective_stop(self) -> tuple[bool, str]:
@@ -856,8 +1431,7 @@ class RobotTCPClient:
         if result is None:
             return False, "No response from Dashboard"
         
-        low_res = result.lower()
-        if "protective stop releasing" in low_res or "unlocking" in low_res:
+        if _classify_reply(result, "unlock") == "ok":
             return True, result
         
         return False, result
@@ -1,134 +1,232 @@
+import argparse
 import subprocess
 import sys
 import os
-import platform
 import time
-import threading
 import signal
+import threading
+import queue
 import re
 import socket
+import hashlib
+import shutil
+import functools
+import venv
+
+# Optional: only used to print QR codes. This script runs on the system Python, which may have
+# neither (setup only installs qrcode, and only into the backend venv)
+try:
+    import segno
+except ImportError:
+    segno = None
+try:
+    import qrcode
+except ImportError:
+    qrcode = None
 
 # Configuration
 BACKEND_DIR = "backend"
 FRONTEND_DIR = "frontend"
 VENV_DIR = ".venv"
 REQUIREMENTS_FILE = os.path.join(BACKEND_DIR, "requirements.txt")
+PACKAGE_JSON_FILE = os.path.join(FRONTEND_DIR, "package.json")
+PACKAGE_LOCK_FILE = os.path.join(FRONTEND_DIR, "package-lock.json")
+# A dependency added to package.json without regenerating the lockfile must still trigger npm install
+FRONTEND_DEP_FILES = (PACKAGE_JSON_FILE, PACKAGE_LOCK_FILE)
+# Hashes of the dependency files as of the last successful install
+REQUIREMENTS_STAMP = os.path.join(VENV_DIR, ".requirements.hash")
+PACKAGE_LOCK_STAMP = os.path.join(FRONTEND_DIR, "node_modules", ".package-lock.hash")
 # Tunnel Configuration
-# Options: "none", "cloudflare"
+# Options: see TUNNEL_PROVIDERS ("none", "cloudflare")
 DEFAULT_TUNNEL_PROVIDER = "none"
 
-# Allow overriding via command line argument (e.g., python run.py cloudflare)
-TUNNEL_PROVIDER = sys.argv[1].lower() if len(sys.argv) > 1 else DEFAULT_TUNNEL_PROVIDER
+# Public URL printed by `cloudflared tunnel --url ...` (matched against raw output bytes)
+TRYCLOUDFLARE_URL_RE = re.compile(rb'https?://[a-zA-Z0-9-]+\.trycloudflare\.com')
+
+IS_WINDOWS = os.name == "nt"
+# Start each service in its own process group, so shutdown reaches the whole tree
+# (npm -> vite -> esbuild, uvicorn --reload -> server) and not just the direct child
+NEW_PROCESS_GROUP = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if IS_WINDOWS else {"start_new_session": True}
 
-print(f"[Config] Tunnel provider: {TUNNEL_PROVIDER}")
+# Executables inside the venv; the layout depends only on the OS, so resolve them once
+VENV_BIN_DIR = os.path.join(VENV_DIR, "Scripts" if IS_WINDOWS else "bin")
+VENV_PYTHON = os.path.join(VENV_BIN_DIR, "python.exe" if IS_WINDOWS else "python")
+VENV_PIP = os.path.join(VENV_BIN_DIR, "pip.exe" if IS_WINDOWS else "pip")
+# npm is a batch script (npm.cmd) on Windows; resolving it lets us launch it without a cmd.exe shell
+NPM_CMD = (shutil.which("npm.cmd") if IS_WINDOWS else None) or shutil.which("npm") or "npm"
 
-def is_windows():
-    return platform.system().lower() == "windows"
+# DEV_RELOAD=1 restarts the backend on code changes. Off by default: --reload adds a watcher
+# process in front of the server, which the orchestrator doesn't need
+DEV_RELOAD = os.environ.get("DEV_RELOAD") == "1"
+
+# Set from the command line in main() (e.g., python run.py cloudflare)
+TUNNEL_PROVIDER = DEFAULT_TUNNEL_PROVIDER
 
 def get_venv_python():
-    if is_windows():
-        return os.path.join(VENV_DIR, "Scripts", "python.exe")
-    return os.path.join(VENV_DIR, "bin", "python")
+    return VENV_PYTHON
 
 def get_venv_pip():
-    if is_windows():
-        return os.path.join(VENV_DIR, "Scripts", "pip.exe")
-    return os.path.join(VENV_DIR, "bin", "pip")
+    return VENV_PIP
+
+def file_hash(*paths):
+    """One hash over the contents of all the given files."""
+    h = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def is_up_to_date(source_files, stamp_file):
+    """True if stamp_file records the current hash of source_files (i.e. the last install used them)."""
+    try:
+        with open(stamp_file) as f:
+            return f.read().strip() == file_hash(*source_files)
+    except OSError:
+        return False
+
+def write_stamp(source_files, stamp_file, digest=None):
+    with open(stamp_file, "w") as f:
+        f.write(digest or file_hash(*source_files))
 
 def setup_venv():
+    """Create the venv if needed and start installing backend dependencies. Returns the install Popen, or None."""
     if not os.path.exists(VENV_DIR):
         print(f"[Setup] Creating virtual environment in {VENV_DIR}...")
-        subprocess.check_call([sys.executable, "-m", "venv", VENV_DIR])
+        # Build it in-process instead of starting a second interpreter for `python -m venv`
+        venv.EnvBuilder(with_pip=True, symlinks=not IS_WINDOWS).create(VENV_DIR)
     
+    # pip's resolver takes seconds even when nothing changed; skip it while requirements.txt is unchanged
+    if is_up_to_date((REQUIREMENTS_FILE,), REQUIREMENTS_STAMP):
+        print("[Setup] Backend dependencies up to date.")
+        return None
+
     print("[Setup] Installing/Updating backend dependencies...")
-    subprocess.check_call([get_venv_python(), "-m", "pip", "install", "-r", REQUIREMENTS_FILE])
+    if shutil.which("uv"):
+        # uv resolves and installs far faster than pip, into the same venv
+        return subprocess.Popen(["uv", "pip", "install", "--python", get_venv_python(), "-r", REQUIREMENTS_FILE])
+    return subprocess.Popen([
+        get_venv_python(), "-m", "pip", "install",
+        "--disable-pip-version-check", "--no-input", "-q",
+        "-r", REQUIREMENTS_FILE
+    ])
 
 def setup_frontend():
-    print("[Setup] Installing frontend dependencies (npm)...")
-    # Using shell=True for windows npm compatibility if not in path as executable
-    subprocess.check_call(["npm", "install"], cwd=FRONTEND_DIR, shell=is_windows())
-
+    """Start installing frontend dependencies. Returns the install Popen, or None if up to date."""
+    if os.path.isdir(os.path.join(FRONTEND_DIR, "node_modules")) and is_up_to_date(FRONTEND_DEP_FILES, PACKAGE_LOCK_STAMP):
+        print("[Setup] Frontend dependencies up to date.")
+        return None
 
+    if not shutil.which(NPM_CMD):
+        raise RuntimeError("npm was not found in PATH; install Node.js first")
+    print("[Setup] Installing frontend dependencies (npm)...")
+    return subprocess.Popen([NPM_CMD, "install"], cwd=FRONTEND_DIR)
+
+def setup_dependencies():
+    """Run the pip and npm installs concurrently; they are independent and mostly wait on the network."""
+    # pip never touches requirements.txt, so hash it up front: an edit made while pip runs must not
+    # be recorded as installed. npm install may rewrite package-lock.json, so the frontend files are hashed afterwards.
+    requirements_digest = file_hash(REQUIREMENTS_FILE)
+    backend_install = setup_venv()
+    try:
+        frontend_install = setup_frontend()
+    except Exception:
+        # Don't leave pip running in the background when setup is about to abort
+        if backend_install:
+            backend_install.kill()
+        raise
+    installs = [
+        (backend_install, (REQUIREMENTS_FILE,), REQUIREMENTS_STAMP, requirements_digest),
+        (frontend_install, FRONTEND_DEP_FILES, PACKAGE_LOCK_STAMP, None),
+    ]
+    installs = [install for install in installs if install[0] is not None]
+
+    # Wait for both before raising, so a failure doesn't leave the other install running
+    for p, _, _, _ in installs:
+        p.wait()
+    for p, source, stamp, digest in installs:
+        if p.returncode != 0:
+            raise subprocess.CalledProcessError(p.returncode, p.args)
+        write_stamp(source, stamp, digest)
+
+
+def start_cloudflared(exe_path, local_url):
+    """Start a quick tunnel plus a daemon thread that reports its public URL. Returns (process, url_queue)."""
+    cmd = [exe_path, "tunnel", "--url", local_url]
+    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **NEW_PROCESS_GROUP)
+    url_queue = queue.Queue()
+    threading.Thread(target=read_tunnel_output, args=(p, url_queue), daemon=True).start()
+    return p, url_queue
+
+def read_tunnel_output(p, url_queue):
+    # Cloudflare prints URL to stderr usually, but we captured stdout/err together.
+    # Keep draining after the URL is found so a full pipe never stalls cloudflared.
+    found = False
+    for line in p.stdout:
+        if found:
+            continue
+        # Match on the raw bytes; only the URL itself gets decoded
+        match = TRYCLOUDFLARE_URL_RE.search(line)
+        if match:
+            url_queue.put(match.group(0).decode('ascii'))
+            found = True
+    if not found:
+        url_queue.put(None)
+
+def wait_for_tunnel_url(url_queue, deadline):
+    """Return the tunnel's public URL, or None if it exits or the deadline passes first."""
+    try:
+        return url_queue.get(timeout=max(0.0, deadline - time.time()))
+    except queue.Empty:
+        return None
 
-def setup_tunnel():
+def setup_local_access():
+    """No tunnel: point the frontend at this machine's LAN IP."""
     global USE_NGROK
-    backend_url = None
-    frontend_url = None
+    print("[Tunnel] Tunnel provider disabled (using local access only).")
+    
+    # Find the local IP (e.g., 192.168.1.15) to configure the frontend
+    local_ip = get_lan_ip() or "localhost"
+        
+    print(f"[Config] Configuring Frontend to use Local IP: http://{local_ip}:8000")
+    
+    # Write the Local IP to the frontend .env.local
+    with open(os.path.join(FRONTEND_DIR, ".env.local"), "w") as f:
+        f.write(f"VITE_API_BASE_URL=http://{local_ip}:8000\n")
+        
+    USE_NGROK = False
+    return None, None
 
-    if TUNNEL_PROVIDER == "none":
-        print("[Tunnel] Tunnel provider disabled (using local access only).")
+def setup_cloudflare():
+    """Open cloudflared quick tunnels for the backend and frontend. Returns (backend_url, frontend_url)."""
+    global USE_NGROK
+    print("[cloudflare] Setting up tunnels...")
+    try:
+        # Check if cloudflared.exe exists
+        exe_path = "cloudflared.exe"
+        if not os.path.exists(exe_path):
+            # Try finding it in PATH
+            exe_path = "cloudflared"
         
-        # Find the local IP (e.g., 192.168.1.15) to configure the frontend
-        local_ip = "localhost"
-        try:
-            # Connect to a dummy external IP to get the interface IP
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            local_ip = s.getsockname()[0]
-            s.close()
-        except:
-            pass
-            
-        print(f"[Config] Configuring Frontend to use Local IP: http://{local_ip}:8000")
+        # Start both tunnels up front so they negotiate in parallel
+        p_back, back_urls = start_cloudflared(exe_path, "http://localhost:8000")
+        processes.append(p_back)
+        p_front, front_urls = start_cloudflared(exe_path, "http://localhost:8080")
+        processes.append(p_front)
+
+        deadline = time.time() + 15
+        backend_url = wait_for_tunnel_url(back_urls, deadline)
+        if backend_url:
+            print(f"[cloudflare] Backend: {backend_url}")
+        frontend_url = wait_for_tunnel_url(front_urls, deadline)
+        if frontend_url:
+            print(f"[cloudflare] Frontend: {frontend_url}")
         
-        # Write the Local IP to the frontend .env.local
-        with open(os.path.join(FRONTEND_DIR, ".env.local"), "w") as f:
-            f.write(f"VITE_API_BASE_URL=http://{local_ip}:8000\n")
-            
-        USE_NGROK = False
+        USE_NGROK = True
+    except Exception as e:
+        print(f"[cloudflare] Error: {e}")
+        print("Make sure 'cloudflared.exe' is in this folder!")
         return None, None
 
-    elif TUNNEL_PROVIDER == "cloudflare":
-        print("[cloudflare] Setting up tunnels...")
-        try:
-            # Check if cloudflared.exe exists
-            exe_path = "cloudflared.exe"
-            if not os.path.exists(exe_path):
-                # Try finding it in PATH
-                exe_path = "cloudflared"
-            
-            # Backend Tunnel
-            cmd_back = [exe_path, "tunnel", "--url", "http://localhost:8000"]
-            p_back = subprocess.Popen(cmd_back, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=is_windows())
-            
-            # Cloudflare prints URL to stderr usually, but we captured stdout/err together
-            start_time = time.time()
-            while time.time() - start_time < 15:
-                line = p_back.stdout.readline()
-                if not line: break
-                line_str = line.decode('utf-8', errors='ignore').strip()
-                # Look for trycloudflare.com
-                if "trycloudflare.com" in line_str:
-                    match = re.search(r'https?://[a-zA-Z0-9-]+\.trycloudflare\.com', line_str)
-                    if match:
-                        backend_url = match.group(0)
-                        print(f"[cloudflare] Backend: {backend_url}")
-                        break
-            processes.append(p_back)
-
-            # Frontend Tunnel
-            cmd_front = [exe_path, "tunnel", "--url", "http://localhost:8080"]
-            p_front = subprocess.Popen(cmd_front, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=is_windows())
-            
-            start_time = time.time()
-            while time.time() - start_time < 15:
-                line = p_front.stdout.readline()
-                if not line: break
-                line_str = line.decode('utf-8', errors='ignore').strip()
-                if "trycloudflare.com" in line_str:
-                    match = re.search(r'https?://[a-zA-Z0-9-]+\.trycloudflare\.com', line_str)
-                    if match:
-                        frontend_url = match.group(0)
-                        print(f"[cloudflare] Frontend: {frontend_url}")
-                        break
-            processes.append(p_front)
-            
-            USE_NGROK = True
-        except Exception as e:
-            print(f"[cloudflare] Error: {e}")
-            print("Make sure 'cloudflared.exe' is in this folder!")
-            return None, None
-
     if backend_url:
         with open(os.path.join(FRONTEND_DIR, ".env.local"), "w") as f:
             f.write(f"VITE_API_BASE_URL={backend_url}\n")
@@ -136,6 +234,23 @@ def setup_tunnel():
 
     return None, None
 
+# Tunnel providers: name -> setup function returning (backend_url, frontend_url)
+TUNNEL_PROVIDERS = {
+    "none": setup_local_access,
+    "cloudflare": setup_cloudflare,
+}
+
+def setup_tunnel():
+    return TUNNEL_PROVIDERS[TUNNEL_PROVIDER]()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Set up and run the UR5 controller backend and frontend.")
+    parser.add_argument(
+        "tunnel", nargs="?", type=str.lower, default=DEFAULT_TUNNEL_PROVIDER, choices=list(TUNNEL_PROVIDERS),
+        help=f"How to expose the app (default: {DEFAULT_TUNNEL_PROVIDER})"
+    )
+    return parser.parse_args()
+
 USE_NGROK = False
 processes = []
 
@@ -144,73 +259,168 @@ def start_backend():
     python_executable = get_venv_python()
     cmd = [
         python_executable, "-m", "uvicorn", "backend.main:app", 
-        "--reload", 
         "--host", "0.0.0.0", 
         "--port", "8000",
         "--log-level", "info"
     ]
+    if DEV_RELOAD:
+        # Only watch backend code; watching the whole tree would also scan frontend/node_modules
+        cmd.extend(["--reload", "--reload-dir", BACKEND_DIR])
     # Removed SSL for local dev to prevent mixed content/handshake timeouts
     # if not USE_NGROK:
     #     cmd.extend(["--ssl-keyfile", "certs/key.pem", "--ssl-certfile", "certs/cert.pem"])
     
-    # Use Popen to keep track of the process
-    p = subprocess.Popen(cmd)
+    # Uvicorn must run as a child: the orchestrator runs on the system Python, while uvicorn and
+    # the backend's dependencies only exist in the venv. Use Popen to keep track of the process
+    p = subprocess.Popen(cmd, **NEW_PROCESS_GROUP)
     processes.append(p)
     return p
 
 def start_frontend():
     print(f"[Frontend] Starting Vite (HTTP)...")
     # Passing --host to vite via npm run dev -- --host
-    cmd = ["npm", "run", "dev", "--", "--host", "0.0.0.0"]
+    cmd = [NPM_CMD, "run", "dev", "--", "--host", "0.0.0.0"]
     
     env = os.environ.copy()
     # Always force HTTP to match backend to avoid mixed content/ssl errors
     env["VITE_NO_HTTPS"] = "true"
 
     # Use Popen to keep track of the process
-    p = subprocess.Popen(cmd, cwd=FRONTEND_DIR, shell=is_windows(), env=env)
+    p = subprocess.Popen(cmd, cwd=FRONTEND_DIR, env=env, **NEW_PROCESS_GROUP)
     processes.append(p)
     return p
 
+def wait_for_port(host, port, timeout, process=None):
+    """Poll until a TCP connect to host:port succeeds.
+
+    Returns False if the timeout passes first, or as soon as `process` (the server, if given) exits.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.settimeout(0.1)
+            if s.connect_ex((host, port)) == 0:
+                return True
+        time.sleep(0.05)
+    return False
+
+@functools.lru_cache(maxsize=1)
+def get_lan_ip():
+    """Return the IP of the interface that routes outside, or None. No DNS lookup involved."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        # Connecting a UDP socket sends nothing; it only makes the OS pick the outgoing interface
+        s.connect(("8.8.8.8", 80))
+        return s.getsockname()[0]
+    except OSError:
+        return None
+    finally:
+        s.close()
+
 def get_local_ips():
+    # gethostname() + getaddrinfo() can stall on a slow resolver and often only yields 127.0.1.1
     ips = []
-    try:
-        # Get hostname
-        hostname = socket.gethostname()
-        # Get all addresses info
-        addr_infos = socket.getaddrinfo(hostname, None)
-        for family, _, _, _, sockaddr in addr_infos:
-            if family == socket.AF_INET: # IPv4
-                ip = sockaddr[0]
-                if not ip.startswith("127."):
-                    ips.append(ip)
-    except:
-        pass
+    ip = get_lan_ip()
+    if ip and not ip.startswith("127."):
+        ips.append(ip)
     
     # Fallback/Always include localhost
     if not ips:
         ips.append("localhost")
     return ips
 
+# Half-block glyph for a (top, bottom) pair of modules, True = dark. Light modules are drawn
+# so the code scans on a dark terminal background (same look as qrcode's print_ascii(invert=True))
+QR_HALF_BLOCKS = {
+    (False, False): "\u2588",
+    (False, True): "\u2580",
+    (True, False): "\u2584",
+    (True, True): " ",
+}
+
+def render_qr(matrix):
+    """Render rows of dark/light modules as text, two rows per line."""
+    rows = [[bool(m) for m in row] for row in matrix]
+    if len(rows) % 2:
+        # Pad with dark (blank) modules so the spare half-row stays background
+        rows.append([True] * len(rows[0]))
+    return "\n".join(
+        "".join(QR_HALF_BLOCKS[pair] for pair in zip(top, bottom))
+        for top, bottom in zip(rows[::2], rows[1::2])
+    )
+
 def print_qr_code(url, label):
-    try:
-        import qrcode
+    # Prefer segno (much faster to encode); fall back to qrcode
+    if segno is not None:
+        # make_qr: segno.make may pick a Micro QR code, which many phone cameras can't scan
+        matrix = segno.make_qr(url, error='l').matrix_iter(border=1)
+    elif qrcode is not None:
         qr = qrcode.QRCode(version=1, border=1)
         qr.add_data(url)
         qr.make(fit=True)
-        print(f"\n   {label} ({url}):")
-        qr.print_ascii(invert=True)
-    except ImportError:
-        print(f"\n   [QR] Could not generate QR for {url} (qrcode library missing)")
+        matrix = qr.get_matrix()
+    else:
+        print(f"\n   [QR] Could not generate QR for {url} (segno/qrcode library missing)")
+        return
+
+    # Build the whole code first and write it in one go instead of line by line
+    sys.stdout.write(f"\n   {label} ({url}):\n{render_qr(matrix)}\n")
+    sys.stdout.flush()
+
+def signal_process_group(p, force=False):
+    """Ask every process in p's group (see NEW_PROCESS_GROUP) to exit, or kill it if force is set."""
+    if IS_WINDOWS:
+        # Windows can only deliver Ctrl+Break to a group; p.kill() ends the leader alone
+        if force:
+            p.kill()
+        else:
+            p.send_signal(signal.CTRL_BREAK_EVENT)
+    else:
+        os.killpg(p.pid, signal.SIGKILL if force else signal.SIGTERM)
 
-def main():
-    print("=== UR5 Controller Orchestrator ===")
-    
-    # 1. Setup Phase
-    tunnels = (None, None)
+def stop_processes(procs, grace=1.0):
+    """Ask every process group to exit at once, wait until they all have (or grace runs out), then kill the rest."""
+    for p in procs:
+        try:
+            signal_process_group(p)
+        except:
+            pass
+
+    # Stop waiting as soon as all have exited rather than always sleeping the full grace period
+    try:
+        deadline = time.monotonic() + grace
+        while any(p.poll() is None for p in procs) and time.monotonic() < deadline:
+            time.sleep(0.02)
+    except KeyboardInterrupt:
+        # If user presses Ctrl+C again during shutdown, move straight to kill
+        pass
+
+    for p in procs:
+        if p.poll() is None:
+            try:
+                signal_process_group(p, force=True)
+            except:
+                pass
+
+def handle_sigterm(signum, frame):
+    raise KeyboardInterrupt
+
+# Where the platform supports it, sleep on SIGCHLD instead of polling every child once a second
+CAN_WAIT_FOR_SIGCHLD = hasattr(signal, "SIGCHLD") and hasattr(signal, "sigtimedwait")
+
+def wait_for_child_exit(timeout):
+    """Block until some child process changes state or the timeout passes."""
+    if CAN_WAIT_FOR_SIGCHLD:
+        # SIGCHLD is blocked in main(), so it stays pending until we collect it here
+        signal.sigtimedwait([signal.SIGCHLD], timeout)
+    else:
+        time.sleep(timeout)
+
+def run_services():
+    """Start the tunnel, backend and frontend, then block until one of them exits."""
     try:
-        setup_venv()
-        setup_frontend()
         tunnels = setup_tunnel()
     except Exception as e:
         print(f"[Error] Setup failed: {e}")
@@ -220,16 +430,18 @@ def main():
 
     # 2. Run Phase (Non-blocking with Popen)
     print("\n[Orchestrator] Starting Backend...")
-    start_backend()
+    backend = start_backend()
     
     print("[Orchestrator] Waiting for backend to initialize...")
-    time.sleep(3) # Give backend a moment
+    if not wait_for_port("127.0.0.1", 8000, 10, backend):
+        print("[Orchestrator] Backend is not accepting connections yet, continuing anyway...")
     
     print("[Orchestrator] Starting Frontend...")
-    start_frontend()
+    frontend = start_frontend()
     
     print("[Orchestrator] Waiting for frontend to initialize...")
-    time.sleep(2)
+    if not wait_for_port("127.0.0.1", 8080, 10, frontend):
+        print("[Orchestrator] Frontend is not accepting connections yet, continuing anyway...")
 
     # 3. Open Browser Phase
     backend_tunnel, frontend_tunnel = tunnels
@@ -269,55 +481,51 @@ def main():
 
     print("="*50 + "\n")
 
+    print("\n[Monitor] Press Ctrl+C to shut down all services safely.\n")
 
-    target_url = "http://localhost:8080"
-    for ip in local_ips:
-        if ip != "localhost":
-            target_url = f"http://{ip}:8080"
-            break
+    # Keep main thread alive and monitor processes
+    while True:
+        # Check if any process died unexpectedly
+        for p in processes:
+            if p.poll() is not None:
+                print(f"\n[Monitor] A service (PID {p.pid}) exited with code {p.returncode}. Shutting down...")
+                return
+        # With SIGCHLD the timeout is only a safety net; we normally wake as soon as a child exits
+        wait_for_child_exit(30 if CAN_WAIT_FOR_SIGCHLD else 1)
 
-    print("\n[Monitor] Press Ctrl+C to shut down all services safely.\n")
+def main():
+    global TUNNEL_PROVIDER
+    TUNNEL_PROVIDER = parse_args().tunnel
+    print(f"[Config] Tunnel provider: {TUNNEL_PROVIDER}")
+
+    # Treat SIGTERM (e.g. `kill <pid>`, a service manager) like Ctrl+C so children are cleaned up too
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+    print("=== UR5 Controller Orchestrator ===")
+    
+    # 1. Setup Phase
+    try:
+        setup_dependencies()
+    except Exception as e:
+        print(f"[Error] Setup failed: {e}")
+        sys.exit(1)
+
+    if CAN_WAIT_FOR_SIGCHLD:
+        # Keep SIGCHLD pending (its default action discards it) so wait_for_child_exit() can pick it up.
+        # Block it before setup_tunnel() starts the cloudflared reader threads: threads inherit the mask,
+        # and one that had SIGCHLD unblocked could take (and discard) it instead of the monitor loop.
+        signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGCHLD])
 
+    # The services run in their own process groups and never see the terminal's Ctrl+C, so
+    # whatever stops us (Ctrl+C, SIGTERM, a failed step or a service exiting) must stop them too
     try:
-        # Keep main thread alive and monitor processes
-        while True:
-            time.sleep(1)
-            # Check if any process died unexpectedly
-            for p in processes:
-                if p.poll() is not None:
-                    print(f"\n[Monitor] A service (PID {p.pid}) exited with code {p.returncode}. Shutting down...")
-                    raise KeyboardInterrupt
+        run_services()
     except KeyboardInterrupt:
+        pass
+    finally:
         print("\n[Stop] Shutting down gracefully...")
-        for p in processes:
-            try:
-                # Polite terminate
-                if is_windows():
-                    # On Windows, p.terminate() is same as p.kill() for non-GUI processes
-                    # We try to be polite but Windows is Windows
-                    p.terminate()
-                else:
-                    p.terminate()
-            except:
-                pass
-        
-        # Give them a moment to cleanup
-        try:
-            time.sleep(1)
-        except KeyboardInterrupt:
-            # If user presses Ctrl+C again during shutdown, move straight to kill
-            pass
-        
-        for p in processes:
-            if p.poll() is None:
-                try:
-                    # Force kill if still alive
-                    p.kill()
-                except:
-                    pass
-        
+        stop_processes(processes)
         print("[Stop] Cleanup complete. Goodbye.")
-        sys.exit(0)
 
 if __name__ == "__main__":
     main()
@@ -31,15 +31,20 @@ def test_data():
     print("Started synchronization. Reading data for 5 seconds...")
     
     try:
-        start_time = time.time()
-        while time.time() - start_time < 5:
+        # Keep receiving at the robot's rate and only print every 0.5 s; sleeping instead would let
+        # samples queue up so each print shows older and older data
+        start_time = time.monotonic()
+        next_print = start_time
+        while time.monotonic() - start_time < 5:
             state = con.receive()
             if state is None:
                 break
             
-            # Print timestamp and actual_q
-            print(f"Timestamp: {state.timestamp:.4f}, Actual Q: {['%.4f' % q for q in state.actual_q]}")
-            time.sleep(0.5)
+            now = time.monotonic()
+            if now >= next_print:
+                # Print timestamp and actual_q
+                print(f"Timestamp: {state.timestamp:.4f}, Actual Q: [{', '.join(f'{q:.4f}' for q in state.actual_q)}]")
+                next_print = now + 0.5
             
     except KeyboardInterrupt:
         pass